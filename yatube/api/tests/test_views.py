@@ -0,0 +1,132 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from core.testing import OnCommitMixin
+from posts.models import Comment, Follow, Group, Post
+
+
+class ApiViewsTest(OnCommitMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer',
+                                              first_name='Имя')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.posts = [Post.objects.create(author=cls.author, group=cls.group,
+                                         text=f'Пост {i}')
+                     for i in range(13)]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_feed_returns_requested_fields_only(self):
+        """Тест выдачи только запрошенных полей"""
+        response = self.guest_client.get(reverse('api:posts'),
+                                         {'fields': 'id,author'})
+        self.assertEqual(response.json()['results'][0],
+                         {'id': self.post.id, 'author': 'writer'})
+        response = self.guest_client.get(reverse('api:posts'),
+                                         {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_feed_follows_cursor(self):
+        """Тест перехода по курсору до конца ленты"""
+        url = reverse('api:group_posts', kwargs={'slug': self.group.slug})
+        url += '?fields=id'
+        seen = []
+        while url:
+            data = self.guest_client.get(url).json()
+            seen += [item['id'] for item in data['results']]
+            url = data['next']
+        self.assertEqual(seen, [post.id for post in reversed(self.posts)])
+
+    def test_feed_is_one_query(self):
+        """Тест выдачи ленты одним запросом без моделей"""
+        with self.assertNumQueries(1):
+            self.guest_client.get(reverse('api:posts'))
+
+    def test_objects_and_comments(self):
+        """Тест поста, группы, профиля и комментариев"""
+        post = self.guest_client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.id}),
+            {'fields': 'text,group,comments_count'}).json()
+        self.assertEqual(post, {'text': 'Пост 12', 'group': 'group',
+                                'comments_count': 1})
+        group = self.guest_client.get(
+            reverse('api:group_detail', kwargs={'slug': 'group'})).json()
+        self.assertEqual(group['posts_count'], 13)
+        profile = self.guest_client.get(
+            reverse('api:profile_detail', kwargs={'username': 'writer'}),
+            {'fields': 'first_name,posts_count'}).json()
+        self.assertEqual(profile, {'first_name': 'Имя', 'posts_count': 13})
+        comments = self.guest_client.get(
+            reverse('api:post_comments', kwargs={'post_id': self.post.id}),
+            {'fields': 'author,text'}).json()
+        self.assertEqual(comments['results'],
+                         [{'author': 'reader', 'text': 'Комментарий'}])
+
+    def test_missing_objects_are_json_404(self):
+        """Тест ответа 404 в JSON"""
+        for url in (reverse('api:post_detail', kwargs={'post_id': 0}),
+                    reverse('api:group_posts', kwargs={'slug': 'none'}),
+                    reverse('api:profile_detail',
+                            kwargs={'username': 'none'})):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
+
+    def test_etag_and_read_only(self):
+        """Тест условных запросов и запрета записи"""
+        url = reverse('api:posts')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.author, text='Новый')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.guest_client.post(url).status_code, 405)
+
+    def test_group_and_profile_etags(self):
+        """Тест ETag группы и профиля и их смены при правке"""
+        group_url = reverse('api:group_detail', kwargs={'slug': 'group'})
+        profile_url = reverse('api:profile_detail',
+                              kwargs={'username': 'writer'})
+        edits = (
+            (group_url, lambda: Group.objects.get(pk=self.group.pk).save()),
+            (profile_url, lambda: User.objects.get(pk=self.author.pk).save()),
+            (group_url, lambda: Post.objects.create(
+                author=self.reader, group=self.group, text='Новый')),
+            (profile_url, lambda: Post.objects.create(
+                author=self.author, text='Новый')),
+        )
+        for url, edit in edits:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(url,
+                                                 HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                with self.captureOnCommitCallbacks(execute=True):
+                    edit()
+                response = self.guest_client.get(url,
+                                                 HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_follow_feed_requires_login(self):
+        """Тест ленты подписок только для вошедших"""
+        url = reverse('api:follow_posts')
+        self.assertEqual(self.guest_client.get(url).status_code, 401)
+        Follow.objects.create(user=self.reader, author=self.author)
+        client = Client()
+        client.force_login(self.reader)
+        data = client.get(url, {'fields': 'id'}).json()
+        self.assertEqual(data['results'][0], {'id': self.post.id})
+        self.assertIsNotNone(data['next'])
@@ -0,0 +1,207 @@
+"""JSON API только для чтения: посты, группы, профили и комментарии.
+
+Наборы записей, правила доступа и ETag те же, что у HTML-страниц, но
+вместо моделей и шаблонов строки values() с полями из ?fields=.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_safe
+
+from posts import querysets, views as html_views
+from posts.cache import etags_enabled, feed_versions, make_etag, user_version
+from posts.models import Group, Post
+from posts.utils import paginator
+
+# Имя поля в ответе и путь к нему для values().
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+GROUP_FIELDS = {
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+    'posts_count': 'posts_count',
+}
+PROFILE_FIELDS = {
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'posts_count': 'post_counter__posts_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def error(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def api_view(view):
+    """Только чтение, ошибки в JSON вместо HTML-страниц."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return error('Не найдено', 404)
+        except FieldsError as exc:
+            return error(str(exc), 400)
+    return wrapper
+
+
+def requested_fields(request, fields):
+    """Поля из ?fields=a,b или все поля ресурса."""
+    names = [name for name in request.GET.get('fields', '').split(',')
+             if name]
+    if not names:
+        return fields
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise FieldsError(f'Неизвестные поля: {", ".join(unknown)}')
+    return {name: fields[name] for name in names}
+
+
+def serialize(row, fields, prefix=''):
+    item = {name: row[prefix + lookup] for name, lookup in fields.items()}
+    if item.get('image'):
+        item['image'] = settings.MEDIA_URL + item['image']
+    if 'posts_count' in item and item['posts_count'] is None:
+        item['posts_count'] = 0
+    return item
+
+
+def page_url(request, param, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    for name in ('after', 'before', 'page'):
+        params.pop(name, None)
+    params[param] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def page_response(request, rows, fields, per_page, count=None,
+                  field='pub_date', prefix=''):
+    """Страница ленты по курсору из строк values().
+
+    Дата и id для курсора выбираются всегда, даже если их нет в ?fields=.
+    """
+    fields = requested_fields(request, fields)
+    lookups = {prefix + lookup for lookup in fields.values()}
+    page_obj = paginator(request, rows.values(*lookups | {'id', field}),
+                         per_page, count=count, field=field)
+    return JsonResponse({
+        'results': [serialize(row, fields, prefix) for row in page_obj],
+        'next': page_url(request, 'after', page_obj.next_cursor),
+        'previous': page_url(request, 'before', page_obj.previous_cursor),
+    }, encoder=DjangoJSONEncoder, json_dumps_params={'ensure_ascii': False})
+
+
+def group_detail_etag(request, slug):
+    # Правка группы сбрасывает общую версию лент, счётчик меняют посты.
+    posts_count = (Group.objects.filter(slug=slug)
+                   .values_list('posts_count', flat=True).first())
+    if posts_count is None or not etags_enabled():
+        return None
+    return make_etag(*feed_versions(), posts_count, request.GET.urlencode())
+
+
+def profile_detail_etag(request, username):
+    # Правка пользователя сбрасывает его версию, счётчик меняют посты.
+    state = (User.objects.filter(username=username)
+             .values_list('pk', 'post_counter__posts_count').first())
+    if state is None or not etags_enabled():
+        return None
+    author_id, posts_count = state
+    return make_etag(*feed_versions(user_version(author_id)), posts_count,
+                     request.GET.urlencode())
+
+
+def object_response(request, queryset, fields, **lookup):
+    fields = requested_fields(request, fields)
+    row = queryset.filter(**lookup).values(*set(fields.values())).first()
+    if row is None:
+        raise Http404
+    return JsonResponse(serialize(row, fields), encoder=DjangoJSONEncoder,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+@api_view
+@condition(etag_func=html_views.index_etag)
+def posts(request, count_of_posts=10):
+    return page_response(request, querysets.index_posts(), POST_FIELDS,
+                         count_of_posts)
+
+
+@api_view
+@condition(etag_func=html_views.post_detail_etag)
+def post_detail(request, post_id):
+    return object_response(request, Post.objects, POST_FIELDS, pk=post_id)
+
+
+@api_view
+@condition(etag_func=html_views.post_detail_etag)
+def post_comments(request, post_id, count_of_comments=20):
+    post = get_object_or_404(Post, pk=post_id)
+    return page_response(request, querysets.post_comments(post),
+                         COMMENT_FIELDS, count_of_comments,
+                         count=post.comments_count, field='created')
+
+
+@api_view
+@condition(etag_func=group_detail_etag)
+def group_detail(request, slug):
+    return object_response(request, Group.objects, GROUP_FIELDS, slug=slug)
+
+
+@api_view
+@condition(etag_func=html_views.group_posts_etag)
+def group_posts(request, slug, count_of_posts=10):
+    group = get_object_or_404(Group, slug=slug)
+    return page_response(request, querysets.group_posts(group), POST_FIELDS,
+                         count_of_posts, count=group.posts_count)
+
+
+@api_view
+@condition(etag_func=profile_detail_etag)
+def profile_detail(request, username):
+    return object_response(request, User.objects, PROFILE_FIELDS,
+                           username=username)
+
+
+@api_view
+@condition(etag_func=html_views.profile_etag)
+def profile_posts(request, username, count_of_posts=10):
+    author = get_object_or_404(User, username=username)
+    return page_response(request, querysets.author_posts(author), POST_FIELDS,
+                         count_of_posts)
+
+
+@api_view
+def follow_posts(request, count_of_posts=10):
+    if not request.user.is_authenticated:
+        return error('Нужно войти', 401)
+    return page_response(request, querysets.following_entries(request.user),
+                         POST_FIELDS, count_of_posts, prefix='post__')
@@ -0,0 +1,60 @@
+from django.contrib import admin
+
+from .models import OutboxMessage, QueryFingerprint, Task
+
+
+class QueryFingerprintAdmin(admin.ModelAdmin):
+    list_display = ('view', 'sql', 'count', 'total_ms', 'average_ms',
+                    'p95_ms', 'last_seen',)
+    list_filter = ('view',)
+    search_fields = ('sql', 'view',)
+    readonly_fields = ('fingerprint', 'view', 'sql', 'count', 'total_ms',
+                       'p95_ms', 'last_seen',)
+    empty_value_display = '-пусто-'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(QueryFingerprint, QueryFingerprintAdmin)
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts',
+                    'next_attempt', 'created', 'sent',)
+    list_filter = ('status',)
+    search_fields = ('subject', 'recipients',)
+    readonly_fields = ('subject', 'recipients', 'status', 'attempts',
+                       'next_attempt', 'last_error', 'created', 'sent',)
+    empty_value_display = '-пусто-'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'priority', 'status', 'attempts', 'run_after',
+                    'created', 'finished',)
+    list_filter = ('status', 'name',)
+    readonly_fields = ('name', 'payload', 'priority', 'status', 'attempts',
+                       'max_attempts', 'run_after', 'locked_by',
+                       'last_error', 'created', 'finished',)
+    empty_value_display = '-пусто-'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,194 @@
+"""Нагрузочный замер страниц в процессе, без веб-сервера.
+
+Рабочие процессы гоняют запросы через django.test.Client по набору
+сценариев и возвращают время каждого ответа, родитель сводит их в
+пропускную способность и перцентили по каждому адресу.
+"""
+import math
+import multiprocessing
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.db import connections
+from django.db.models import Max
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+def _random_pk(rng, dataset, model):
+    return rng.randint(1, max(dataset[model], 1))
+
+
+def _post_kwargs(rng, dataset):
+    return {'post_id': _random_pk(rng, dataset, 'posts')}
+
+
+# Имя сценария: метод, нужен ли вход, аргументы адреса и данные формы.
+SCENARIOS = {
+    'posts:index': ('GET', False, None, None),
+    'posts:group_list': (
+        'GET', False,
+        lambda rng, d: {'slug': f'group{_random_pk(rng, d, "groups")}'},
+        None),
+    'posts:profile': (
+        'GET', False,
+        lambda rng, d: {'username': f'user{_random_pk(rng, d, "users")}'},
+        None),
+    'posts:post_detail': ('GET', False, _post_kwargs, None),
+    'posts:post_create': (
+        'POST', True, None,
+        lambda rng: {'text': f'Пост из замера {rng.random()}'}),
+    'posts:add_comment': (
+        'POST', True, _post_kwargs,
+        lambda rng: {'text': f'Комментарий из замера {rng.random()}'}),
+    'about:author': ('GET', False, None, None),
+    'about:tech': ('GET', False, None, None),
+    'users:login': ('GET', False, None, None),
+    'users:signup': ('GET', False, None, None),
+    'users:password_change': ('GET', True, None, None),
+}
+
+
+@contextmanager
+def bench_database(path, keep=False):
+    """Подменяет базу на отдельный файл path на время замера.
+
+    С keep файл сохраняется и при следующем замере используется снова.
+    """
+    connection = connections['default']
+    if connection.vendor != 'sqlite':
+        raise CommandError('Замер рассчитан на SQLite')
+    old_name = connection.settings_dict['NAME']
+    connection.settings_dict['TEST'] = {
+        **connection.settings_dict.get('TEST', {}),
+        'NAME': path,
+    }
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True,
+        keepdb=keep and os.path.exists(path), serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0,
+                                            keepdb=keep)
+
+
+def dataset_size():
+    """Наибольшие id пользователей, групп и постов для выбора адресов."""
+    return {
+        'users': User.objects.aggregate(top=Max('pk'))['top'] or 0,
+        'groups': Group.objects.aggregate(top=Max('pk'))['top'] or 0,
+        'posts': Post.objects.aggregate(top=Max('pk'))['top'] or 0,
+    }
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу из отсортированного списка."""
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def worker(number, names, dataset, requests, duration, results):
+    rng = random.Random(number)
+    guest = Client()
+    member = Client()
+    member.force_login(User.objects.get(pk=number % dataset['users'] + 1))
+    timings = defaultdict(list)
+    statuses = defaultdict(Counter)
+    deadline = time.monotonic() + duration if duration else None
+    done = 0
+    while (done < requests if deadline is None
+           else time.monotonic() < deadline):
+        name = names[done % len(names)]
+        method, auth, make_kwargs, make_data = SCENARIOS[name]
+        url = reverse(name, kwargs=make_kwargs(rng, dataset)
+                      if make_kwargs else None)
+        client = member if auth else guest
+        started = time.perf_counter()
+        if method == 'POST':
+            response = client.post(url, make_data(rng))
+        else:
+            response = client.get(url)
+        timings[name].append(time.perf_counter() - started)
+        statuses[name][response.status_code] += 1
+        done += 1
+    connections.close_all()
+    results.put((dict(timings), {name: dict(counts)
+                                 for name, counts in statuses.items()}))
+
+
+def run(names, workers, requests=0, duration=0):
+    """Запускает workers процессов и возвращает сводку по адресам.
+
+    Каждый процесс делает requests запросов или работает duration секунд,
+    по кругу обходя сценарии names.
+    """
+    dataset = dataset_size()
+    # Соединение родителя не должно достаться дочерним процессам.
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(
+            number, names, dataset, requests, duration, results))
+        for number in range(workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    parts = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+    return report(parts, elapsed, workers, dataset)
+
+
+def _summary(timings, statuses, elapsed):
+    timings = sorted(timings)
+    errors = sum(count for status, count in statuses.items()
+                 if status >= 500)
+    return {
+        'requests': len(timings),
+        'errors': errors,
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': _ms(percentile(timings, 50)),
+        'p95_ms': _ms(percentile(timings, 95)),
+        'p99_ms': _ms(percentile(timings, 99)),
+        'statuses': {str(status): count
+                     for status, count in sorted(statuses.items())},
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def report(parts, elapsed, workers, dataset):
+    timings = defaultdict(list)
+    statuses = defaultdict(Counter)
+    for part_timings, part_statuses in parts:
+        for name, values in part_timings.items():
+            timings[name].extend(values)
+        for name, counts in part_statuses.items():
+            statuses[name].update(counts)
+    total_statuses = sum(statuses.values(), Counter())
+    return {
+        'workers': workers,
+        'dataset': dataset,
+        'elapsed_s': round(elapsed, 3),
+        'urls': {name: _summary(timings[name], statuses[name], elapsed)
+                 for name in timings},
+        'total': _summary([value for values in timings.values()
+                           for value in values], total_statuses, elapsed),
+    }
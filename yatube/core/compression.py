@@ -0,0 +1,107 @@
+"""Сжатие gzip для HTML и JSON, в том числе потоковых ответов.
+
+Сжимаются ответы с типом из COMPRESS_CONTENT_TYPES длиннее
+COMPRESS_MIN_LENGTH, если клиент принимает gzip (q=0 считается
+отказом). Потоковый ответ сжимается по частям, каждая часть
+сбрасывается Z_SYNC_FLUSH, так что клиент получает её сразу.
+
+Защита от BREACH: в страницы с CSRF-токеном в заголовок gzip
+дописывается имя файла случайной длины до COMPRESS_BREACH_PADDING байт,
+и длина ответа перестаёт точно отражать совпадения секрета с
+подставленным текстом. Сам токен Django и так маскирует заново в
+каждом ответе.
+"""
+import gzip
+import io
+import secrets
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+from .static import accepted_encodings
+
+
+class _Buffer(io.BytesIO):
+    def take(self):
+        data = self.getvalue()
+        self.seek(0)
+        self.truncate()
+        return data
+
+
+def _gzip_file(buffer, padding, level):
+    # GzipFile пишет filename в поле FNAME заголовка. Пустое имя
+    # выбрасывает поле вместе с завершающим нулём, поэтому длина
+    # берётся от 1: разброс размера не превышает padding.
+    length = 1 + secrets.randbelow(padding) if padding else 0
+    filename = secrets.token_hex(padding)[:length]
+    return gzip.GzipFile(filename=filename, mode='wb', fileobj=buffer,
+                         compresslevel=level, mtime=0)
+
+
+def compress_bytes(content, padding=0, level=6):
+    buffer = _Buffer()
+    with _gzip_file(buffer, padding, level) as stream:
+        stream.write(content)
+    return buffer.getvalue()
+
+
+def compress_chunks(chunks, padding=0, level=6):
+    """Сжимает поток частей, отдавая каждую часть без задержки."""
+    buffer = _Buffer()
+    with _gzip_file(buffer, padding, level) as stream:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            stream.write(chunk)
+            stream.flush(zlib.Z_SYNC_FLUSH)
+            yield buffer.take()
+    yield buffer.take()
+
+
+def compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+    return (content_type in settings.COMPRESS_CONTENT_TYPES
+            and not response.has_header('Content-Encoding'))
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        if not settings.COMPRESS_ENABLE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not compressible(response):
+            return response
+        if (not response.streaming
+                and len(response.content) < settings.COMPRESS_MIN_LENGTH):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if 'gzip' not in accepted_encodings(
+                request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return response
+        # Токен CSRF попал в ответ, если его запросили при отрисовке.
+        padding = (settings.COMPRESS_BREACH_PADDING
+                   if request.META.get('CSRF_COOKIE_USED') else 0)
+        level = settings.COMPRESS_LEVEL
+        if response.streaming:
+            response.streaming_content = compress_chunks(
+                response.streaming_content, padding, level)
+            del response['Content-Length']
+        else:
+            content = compress_bytes(response.content, padding, level)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        # Сильный ETag ослабляется, как в GZipMiddleware: тело уже другое,
+        # но условный GET по нему работает.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'gzip'
+        return response
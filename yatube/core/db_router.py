@@ -0,0 +1,86 @@
+"""Чтение с реплик для страниц, которые только читают данные.
+
+ReadReplicaMiddleware выбирает для запроса одну реплику, роутер
+отправляет на неё чтения этого запроса, кроме сессий и пользователей,
+записи всегда идут в основную базу. Реплики старше
+DATABASE_REPLICA_MAX_LAG секунд не выбираются, а после POST
+пользователь на REPLICA_PIN_SECONDS (не меньше этого отставания)
+закрепляется за основной базой, чтобы видеть свои же изменения.
+"""
+import itertools
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+PRIMARY = 'default'
+# Вход и выход пишут в эти таблицы, а читаются они на каждой странице:
+# с отстающей реплики только что вошедший выглядел бы анонимом.
+PRIMARY_APPS = {'auth', 'sessions'}
+
+_state = threading.local()
+_round_robin = itertools.count()
+
+
+def lag_key(alias):
+    return f'core:replica-synced:{alias}'
+
+
+def mark_synced(alias, at=None):
+    """Запоминает время последней синхронизации реплики."""
+    cache.set(lag_key(alias), time.time() if at is None else at, None)
+
+
+def replica_lags(replicas):
+    """Отставание реплик в секундах, неизвестное считается бесконечным."""
+    synced = cache.get_many([lag_key(alias) for alias in replicas])
+    now = time.time()
+    return {alias: now - synced[lag_key(alias)]
+            if lag_key(alias) in synced else math.inf
+            for alias in replicas}
+
+
+def choose_replica():
+    """Реплика для запроса или None, если читать нужно с основной базы."""
+    replicas = list(settings.DATABASE_REPLICAS)
+    if not replicas:
+        return None
+    lags = replica_lags(replicas)
+    fresh = [alias for alias in replicas
+             if lags[alias] <= settings.DATABASE_REPLICA_MAX_LAG]
+    if not fresh:
+        return None
+    if settings.DATABASE_REPLICA_STRATEGY == 'least_lag':
+        return min(fresh, key=lags.__getitem__)
+    return fresh[next(_round_robin) % len(fresh)]
+
+
+def use_replica(alias):
+    _state.alias = alias
+
+
+def use_primary():
+    _state.alias = None
+
+
+def current_replica():
+    return getattr(_state, 'alias', None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return PRIMARY
+        return current_replica() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, объекты из них совместимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
@@ -0,0 +1,4 @@
+"""Общие для обработки HTTP-запросов значения."""
+
+# Безопасные методы по RFC 7231: данных на сервере они не меняют.
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
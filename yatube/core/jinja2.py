@@ -0,0 +1,89 @@
+"""Окружение Jinja2 для горячих страниц постов.
+
+Даёт шаблонам то же, что шаблоны Django берут из тегов и фильтров:
+url, static, thumbnail, addclass, date, карточки постов и кэш
+фрагментов. Значения выводятся через finalize так же, как в Django:
+даты в местном времени и формате локали.
+"""
+import logging
+
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.formats import localize
+from django.utils.timezone import template_localtime
+from jinja2 import Environment
+from markupsafe import Markup
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from core.templatetags.user_filters import addclass
+from posts.templatetags.post_cards import render_cards
+
+logger = logging.getLogger('sorl.thumbnail')
+
+ENGINE = 'jinja2'
+
+
+def url(name, *args, **kwargs):
+    return reverse(name, args=args, kwargs=kwargs)
+
+
+def thumbnail(file_, geometry, **options):
+    """Миниатюра, как у тега {% thumbnail %}, или None без картинки."""
+    try:
+        if file_:
+            return get_thumbnail(file_, geometry, **options)
+    except Exception:
+        if sorl_settings.THUMBNAIL_DEBUG:
+            raise
+        logger.exception('Thumbnail tag failed')
+    return None
+
+
+def date(value, arg=None):
+    return defaultfilters.date(template_localtime(value), arg)
+
+
+def post_cards(posts, variant):
+    return render_cards(posts, variant, using=ENGINE)
+
+
+def cache_fragment(name, timeout, *vary_on, caller):
+    """Аналог {% cache %} для блока {% call %}.
+
+    Имя фрагмента получает префикс движка: разметка Jinja2 и Django
+    различается пробелами и в общем кэше смешиваться не должна.
+    """
+    try:
+        fragment_cache = caches['template_fragments']
+    except InvalidCacheBackendError:
+        fragment_cache = caches['default']
+    key = make_template_fragment_key(f'{ENGINE}:{name}', vary_on)
+    value = fragment_cache.get(key)
+    if value is None:
+        value = str(caller())
+        fragment_cache.set(key, value, timeout)
+    return Markup(value)
+
+
+def render_value(value):
+    return localize(template_localtime(value))
+
+
+def environment(**options):
+    env = Environment(finalize=render_value, **options)
+    env.globals.update({
+        'url': url,
+        'static': static,
+        'thumbnail': thumbnail,
+        'post_cards': post_cards,
+        'cache_fragment': cache_fragment,
+    })
+    env.filters.update({
+        'addclass': addclass,
+        'date': date,
+    })
+    return env
@@ -0,0 +1,154 @@
+"""Очередь исходящей почты.
+
+EMAIL_BACKEND = 'core.mail.OutboxBackend' не отправляет письма, а кладёт
+их в таблицу OutboxMessage и сразу возвращает управление, так что
+медленный почтовый сервер не держит обработчик запроса. Процесс
+mail_worker забирает письма пачками и отправляет их через
+OUTBOX_EMAIL_BACKEND по одному открытому соединению. Неудачная попытка
+откладывается с экспоненциальной паузой, после OUTBOX_MAX_ATTEMPTS
+письмо помечается неотправленным.
+
+Каждое письмо отмечается сразу после отправки, так что сбой процесса
+повторит не больше одного письма. Очередь рассчитана на один
+mail_worker: второй не запустится, пока занят OUTBOX_LOCK_FILE.
+"""
+import base64
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .sqlite import retry_locked
+
+logger = logging.getLogger(__name__)
+
+
+def dump_message(message):
+    """Письмо в JSON; вложения-MIMEBase не поддерживаются."""
+    attachments = []
+    for filename, content, mimetype in message.attachments:
+        if isinstance(content, str):
+            content = content.encode()
+        attachments.append(
+            [filename, base64.b64encode(content).decode(), mimetype])
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'content_subtype': message.content_subtype,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': attachments,
+    }, ensure_ascii=False)
+
+
+def load_message(payload, connection=None):
+    data = json.loads(payload)
+    message = EmailMultiAlternatives(
+        data['subject'], data['body'], data['from_email'], data['to'],
+        data['bcc'], connection, None, data['headers'],
+        [tuple(alternative) for alternative in data['alternatives']],
+        data['cc'], data['reply_to'])
+    message.content_subtype = data['content_subtype']
+    for filename, content, mimetype in data['attachments']:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Почтовый backend, который только ставит письма в очередь."""
+
+    def send_messages(self, email_messages):
+        rows = [
+            OutboxMessage(subject=message.subject[:255],
+                          recipients=', '.join(message.recipients()),
+                          payload=dump_message(message))
+            for message in email_messages if message.recipients()
+        ]
+        OutboxMessage.objects.bulk_create(rows)
+        return len(rows)
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой: удваивается, но не больше часа."""
+    return timedelta(seconds=min(
+        settings.OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1), 60 * 60))
+
+
+def due_messages(batch_size, now=None):
+    return list(OutboxMessage.objects.filter(
+        status=OutboxMessage.PENDING,
+        next_attempt__lte=now or timezone.now(),
+    ).order_by('next_attempt', 'id')[:batch_size])
+
+
+def _failed(row, error, now):
+    row.attempts += 1
+    row.last_error = f'{type(error).__name__}: {error}'
+    if row.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        row.status = OutboxMessage.FAILED
+        logger.error('Письмо %s не отправлено: %s', row.pk, row.last_error)
+    else:
+        row.next_attempt = now + retry_delay(row.attempts)
+    retry_locked(lambda: row.save(update_fields=[
+        'attempts', 'last_error', 'status', 'next_attempt']))
+
+
+def _sent(row, now):
+    retry_locked(lambda: OutboxMessage.objects.filter(pk=row.pk).update(
+        status=OutboxMessage.SENT, sent=now,
+        attempts=F('attempts') + 1, last_error=''))
+
+
+def send_batch(connection, batch_size=None):
+    """Отправляет очередную пачку писем через открытое соединение.
+
+    Возвращает (отправлено, не удалось). Сбой закрывает соединение,
+    следующее письмо откроет его заново.
+    """
+    rows = due_messages(batch_size or settings.OUTBOX_BATCH_SIZE)
+    sent = failed = 0
+    for row in rows:
+        try:
+            connection.open()
+            connection.send_messages([load_message(row.payload, connection)])
+        except Exception as error:
+            failed += 1
+            _failed(row, error, timezone.now())
+            connection.close()
+        else:
+            sent += 1
+            _sent(row, timezone.now())
+    return sent, failed
+
+
+def outbox_connection():
+    return get_connection(settings.OUTBOX_EMAIL_BACKEND, fail_silently=False)
+
+
+def outbox_state(now=None):
+    """Сводка очереди: письма по состояниям и возраст старейшего."""
+    now = now or timezone.now()
+    counts = dict(OutboxMessage.objects.order_by().values_list('status')
+                  .annotate(count=Count('id')))
+    pending = OutboxMessage.objects.filter(status=OutboxMessage.PENDING)
+    oldest = pending.aggregate(oldest=Min('created'))['oldest']
+    return {
+        'pending': counts.get(OutboxMessage.PENDING, 0),
+        'due': pending.filter(next_attempt__lte=now).count(),
+        'retrying': pending.filter(attempts__gt=0).count(),
+        'sent': counts.get(OutboxMessage.SENT, 0),
+        'failed': counts.get(OutboxMessage.FAILED, 0),
+        'oldest_pending_s': (round((now - oldest).total_seconds(), 1)
+                             if oldest else None),
+    }
@@ -0,0 +1,79 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from core.compression import compress_bytes, compress_chunks
+from posts.models import Group, Post
+
+LEVELS = (1, 6, 9)
+CHUNK = 8 * 1024
+
+
+def page_urls():
+    """Адреса настоящих страниц лент, поста и API из рабочей базы."""
+    post = (Post.objects.select_related('author')
+            .order_by('-comments_count', '-pk').first())
+    group = Group.objects.order_by('-posts_count', 'pk').first()
+    if post is None or group is None:
+        raise CommandError('Нужны посты и группы: см. generate_data')
+    return [
+        reverse('posts:index'),
+        reverse('posts:group_list', kwargs={'slug': group.slug}),
+        reverse('posts:profile', kwargs={'username': post.author.username}),
+        reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        reverse('api:posts'),
+    ]
+
+
+def cpu_ms(func, iterations):
+    started = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - started) / iterations * 1000
+
+
+def measure(content, iterations):
+    padding = settings.COMPRESS_BREACH_PADDING
+    result = {'bytes': len(content)}
+    for level in LEVELS:
+        size = len(compress_bytes(content, padding, level))
+        ms = cpu_ms(lambda: compress_bytes(content, padding, level),
+                    iterations)
+        result[f'gzip_{level}'] = {
+            'bytes': size,
+            'saved': round(1 - size / len(content), 3),
+            'cpu_ms': round(ms, 3),
+            'mb_per_s': round(len(content) / ms / 1000, 1),
+        }
+    chunks = [content[start:start + CHUNK]
+              for start in range(0, len(content), CHUNK)]
+    streamed = b''.join(compress_chunks(chunks, padding,
+                                        settings.COMPRESS_LEVEL))
+    result['streamed'] = {
+        'chunk': CHUNK,
+        'bytes': len(streamed),
+        'saved': round(1 - len(streamed) / len(content), 3),
+    }
+    return result
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает выигрыш в байтах и затраты процессора на сжатие '
+            'настоящих страниц, итог в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        client = Client()
+        report = {}
+        for url in page_urls():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: ответ {response.status_code}')
+            report[url] = measure(response.content, options['iterations'])
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,111 @@
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sqlite import apply_pragmas, write_lock
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT, '
+    'pub_date REAL, author_id INTEGER)',
+    'CREATE INDEX post_pub_date_idx ON post (pub_date DESC, id DESC)',
+)
+
+
+def prepare(path, rows):
+    db = sqlite3.connect(path)
+    for statement in SCHEMA:
+        db.execute(statement)
+    db.executemany(
+        'INSERT INTO post (text, pub_date, author_id) VALUES (?, ?, ?)',
+        (('Текст поста ' * 10, i, i % 50) for i in range(rows)))
+    db.commit()
+    db.close()
+
+
+def worker(path, profile, seconds, write_ratio, seed, results):
+    """Крутит запросы как WSGI-процесс: чтение ленты или новый пост."""
+    rng = random.Random(seed)
+    production = profile == 'production'
+    lock_path = path + '.write-lock' if production else None
+    persistent = None
+    reads = writes = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        # Без профиля Django открывает соединение на каждый запрос.
+        db = persistent or sqlite3.connect(path, timeout=5)
+        if production and persistent is None:
+            apply_pragmas(db, settings.SQLITE_PRODUCTION_PRAGMAS)
+            persistent = db
+        try:
+            if rng.random() < write_ratio:
+                with write_lock(lock_path):
+                    with db:
+                        db.execute(
+                            'INSERT INTO post (text, pub_date, author_id) '
+                            'VALUES (?, ?, ?)',
+                            ('Новый пост', time.time(), rng.randrange(50)))
+                writes += 1
+            else:
+                db.execute(
+                    'SELECT id, text FROM post '
+                    'ORDER BY pub_date DESC, id DESC LIMIT 10 OFFSET ?',
+                    (rng.randrange(100),)).fetchall()
+                reads += 1
+        except sqlite3.OperationalError:
+            errors += 1
+        finally:
+            if db is not persistent:
+                db.close()
+    results.put((reads, writes, errors))
+
+
+def run(profile, workers, seconds, write_ratio, rows):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        prepare(path, rows)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=worker,
+                args=(path, profile, seconds, write_ratio, seed, results))
+            for seed in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    reads, writes, errors = (sum(column) for column in zip(*totals))
+    return {
+        'profile': profile,
+        'reads': reads,
+        'writes': writes,
+        'errors': errors,
+        'requests_per_second': round((reads + writes) / seconds, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность SQLite по умолчанию и '
+            'в профиле production при смешанной нагрузке')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--rows', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        report = [
+            run(profile, options['workers'], options['seconds'],
+                options['write_ratio'], options['rows'])
+            for profile in ('default', 'production')
+        ]
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
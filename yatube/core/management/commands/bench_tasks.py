@@ -0,0 +1,52 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from core.benchmark import bench_database
+from core.models import Task
+from core.tasks import noop, run_pool
+
+
+class Command(BaseCommand):
+    help = ('Замеряет постановку и выполнение пустых фоновых задач на '
+            'отдельной базе, итог в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--db', default=os.path.join(settings.BASE_DIR, 'bench.sqlite3'),
+            help='Файл базы для замера, рабочая база не затрагивается')
+        parser.add_argument('--tasks', type=int, default=5000)
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        count = options['tasks']
+        with override_settings(DEBUG=False), bench_database(options['db']):
+            started = time.perf_counter()
+            for number in range(count):
+                # Как во view: задача в одной транзакции с записью.
+                with transaction.atomic():
+                    noop.delay(number)
+            enqueue = time.perf_counter() - started
+            started = time.perf_counter()
+            done, failed = run_pool(options['processes'],
+                                    options['batch_size'], drain=True)
+            execute = time.perf_counter() - started
+            left = Task.objects.filter(status=Task.QUEUED).count()
+        report = {
+            'tasks': count,
+            'processes': options['processes'],
+            'batch_size': options['batch_size'],
+            'enqueue_per_second': round(count / enqueue, 1),
+            'done': done,
+            'failed': failed,
+            'left': left,
+            'execute_s': round(execute, 3),
+            'execute_per_second': round(done / execute, 1),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,132 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+
+from core.benchmark import percentile
+from posts import querysets
+from posts.cache import author_feed, feed_cache_context, group_feed
+from posts.cache import INDEX_FEED
+from posts.counters import author_posts_count
+from posts.forms import CommentForm
+from posts.models import Group, Post
+from posts.utils import paginator
+from posts.views import comments_page
+
+# Кэш карточек и фрагментов выключен: иначе замерялось бы чтение кэша.
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def make_request(url):
+    request = RequestFactory().get(url)
+    request.user = AnonymousUser()
+    request.resolver_match = resolve(request.path)
+    return request
+
+
+def page_contexts():
+    """Шаблон, запрос и контекст каждой горячей страницы, как во view."""
+    post = (Post.objects.select_related('author', 'group')
+            .order_by('-comments_count', '-pk').first())
+    group = Group.objects.order_by('-posts_count', 'pk').first()
+    if post is None or group is None:
+        raise CommandError('Нужны посты и группы: см. generate_data')
+    author = post.author
+    pages = []
+
+    request = make_request(reverse('posts:index'))
+    page_obj = paginator(request, querysets.index_posts())
+    pages.append(('posts/index.html', request, {
+        'page_obj': page_obj,
+        **feed_cache_context(page_obj, INDEX_FEED),
+    }))
+
+    request = make_request(reverse('posts:group_list',
+                                   kwargs={'slug': group.slug}))
+    page_obj = paginator(request, querysets.group_posts(group),
+                         count=group.posts_count)
+    pages.append(('posts/group_list.html', request, {
+        'group': group,
+        'page_obj': page_obj,
+        **feed_cache_context(page_obj, group_feed(group.pk)),
+    }))
+
+    request = make_request(reverse('posts:profile',
+                                   kwargs={'username': author.username}))
+    posts_count = author_posts_count(author)
+    page_obj = paginator(request, querysets.author_posts(author),
+                         count=posts_count)
+    pages.append(('posts/profile.html', request, {
+        'author': author,
+        'posts_count': posts_count,
+        'following': False,
+        'page_obj': page_obj,
+        **feed_cache_context(page_obj, author_feed(author.pk)),
+    }))
+
+    request = make_request(reverse('posts:post_detail',
+                                   kwargs={'post_id': post.pk}))
+    pages.append(('posts/post_detail.html', request, {
+        'form': CommentForm(),
+        'comments': comments_page(request, post, 20),
+        'post': post,
+        'title': post.text[:30],
+        'count_of_posts': posts_count,
+    }))
+    for _, _, context in pages:
+        # Строки страниц выбираются заранее, в замер попадает только
+        # отрисовка.
+        for value in context.values():
+            if hasattr(value, 'object_list'):
+                list(value.object_list)
+    return pages
+
+
+def measure(template, request, context, iterations):
+    template.render(dict(context), request)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        template.render(dict(context), request)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время отрисовки горячих страниц постов шаблонами '
+            'Django и Jinja2, итог в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        templates = [settings.JINJA2_TEMPLATES] + [
+            engine for engine in settings.TEMPLATES
+            if engine is not settings.JINJA2_TEMPLATES]
+        report = {}
+        with override_settings(DEBUG=False, TEMPLATES=templates,
+                               CACHES=NO_CACHE):
+            for name, request, context in page_contexts():
+                results = {
+                    alias: measure(engines[alias].get_template(name),
+                                   request, context, options['iterations'])
+                    for alias in ('django', 'jinja2')
+                }
+                results['speedup'] = round(
+                    results['django']['mean_ms']
+                    / results['jinja2']['mean_ms'], 2)
+                report[name] = results
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,61 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core import benchmark
+from posts.models import Post
+from posts.ndjson import Progress
+from posts.seed import seed
+
+
+class Command(BaseCommand):
+    help = ('Наполняет отдельную базу и замеряет пропускную способность '
+            'и задержки страниц из нескольких процессов, итог в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--db', default=os.path.join(settings.BASE_DIR, 'bench.sqlite3'),
+            help='Файл базы для замера, рабочая база не затрагивается')
+        parser.add_argument('--keep', action='store_true',
+                            help='Сохранить базу и наполнить её один раз')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на процесс')
+        parser.add_argument('--duration', type=float, default=0,
+                            help='Секунд на процесс вместо --requests')
+        parser.add_argument('--urls', default=','.join(benchmark.SCENARIOS),
+                            help='Имена адресов через запятую')
+        parser.add_argument('--output', help='Файл для JSON, иначе stdout')
+
+    def handle(self, *args, **options):
+        names = [name for name in options['urls'].split(',') if name]
+        unknown = set(names) - set(benchmark.SCENARIOS)
+        if unknown:
+            raise CommandError(f'Неизвестные адреса: {", ".join(unknown)}')
+        # Лимиты частоты остановили бы замер записи, а DEBUG копит запросы.
+        with override_settings(DEBUG=False, RATELIMIT_ENABLE=False), \
+                benchmark.bench_database(options['db'], options['keep']):
+            if not Post.objects.exists():
+                self.seed(options)
+            result = benchmark.run(names, options['workers'],
+                                   options['requests'], options['duration'])
+        output = json.dumps(result, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                stream.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def seed(self, options):
+        progress = Progress(report=self.stderr.write)
+        seed(options['users'], options['groups'], options['posts'],
+             options['comments'], options['batch_size'], progress=progress)
+        self.stderr.write(self.style.SUCCESS(progress.summary()))
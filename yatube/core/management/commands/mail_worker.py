@@ -0,0 +1,61 @@
+import fcntl
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.mail import outbox_connection, outbox_state, send_batch
+
+
+class Command(BaseCommand):
+    help = ('Фоновый процесс, который отправляет письма из очереди '
+            'пачками по одному соединению')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Пауза между опросами пустой очереди, с')
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--once', action='store_true',
+                            help='Разобрать готовые письма и выйти')
+        parser.add_argument('--state', action='store_true',
+                            help='Вывести состояние очереди в JSON и выйти')
+
+    def handle(self, *args, **options):
+        if options['state']:
+            self.stdout.write(json.dumps(outbox_state(), indent=2))
+            return
+        # Два процесса разослали бы одни и те же письма дважды.
+        with open(settings.OUTBOX_LOCK_FILE, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise CommandError('mail_worker уже запущен')
+            self.work(options)
+
+    def work(self, options):
+        connection = outbox_connection()
+        if not options['once']:
+            self.stdout.write('Ожидаю письма, Ctrl+C для выхода')
+        try:
+            while True:
+                sent, failed = send_batch(connection, options['batch_size'])
+                if sent or failed:
+                    self.report(sent, failed)
+                elif options['once']:
+                    break
+                else:
+                    # Простаивающее соединение сервер всё равно закроет.
+                    connection.close()
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Остановлено')
+        finally:
+            connection.close()
+
+    def report(self, sent, failed):
+        state = outbox_state()
+        self.stdout.write(
+            f'Отправлено: {sent}, с ошибкой: {failed}, '
+            f'в очереди: {state["pending"]}, '
+            f'не отправлено: {state["failed"]}')
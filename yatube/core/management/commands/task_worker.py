@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.tasks import purge_done, queue_state, requeue_dead, run_pool
+
+
+class Command(BaseCommand):
+    help = ('Выполняет фоновые задачи из очереди в нескольких рабочих '
+            'процессах')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2)
+        parser.add_argument('--batch-size', type=int,
+                            help='Задач в одной аренде процесса')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Пауза между опросами пустой очереди, с')
+        parser.add_argument('--drain', action='store_true',
+                            help='Выполнить готовые задачи и выйти')
+        parser.add_argument('--state', action='store_true',
+                            help='Вывести состояние очереди в JSON и выйти')
+        parser.add_argument('--requeue-dead', action='store_true',
+                            help='Вернуть отложенные задачи в очередь')
+        parser.add_argument('--purge-days', type=int,
+                            help='Удалить выполненные задачи старше N дней')
+
+    def handle(self, *args, **options):
+        if options['state']:
+            self.stdout.write(json.dumps(queue_state(), indent=2))
+            return
+        if options['requeue_dead']:
+            count = requeue_dead()
+            self.stdout.write(f'Возвращено в очередь: {count}')
+            return
+        if options['purge_days'] is not None:
+            count = purge_done(options['purge_days'])
+            self.stdout.write(f'Удалено выполненных задач: {count}')
+            return
+        if not options['drain']:
+            self.stdout.write('Ожидаю задачи, Ctrl+C для выхода')
+        done, failed = run_pool(options['processes'], options['batch_size'],
+                                options['interval'], options['drain'])
+        self.stdout.write(f'Выполнено: {done}, с ошибкой: {failed}')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from core.models import QueryFingerprint
+
+ORDERS = {'total': '-total_ms', 'count': '-count', 'p95': '-p95_ms'}
+
+
+class Command(BaseCommand):
+    help = 'Выводит самые дорогие формы SQL-запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--order', choices=ORDERS, default='total')
+        parser.add_argument('--view', help='Только запросы этой страницы')
+        parser.add_argument('--reset', action='store_true',
+                            help='Удалить накопленную сводку')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            QueryFingerprint.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS('Сводка очищена'))
+            return
+        rows = QueryFingerprint.objects.order_by(ORDERS[options['order']])
+        if options['view']:
+            rows = rows.filter(view=options['view'])
+        self.stdout.write(f'{"всего, мс":>12} {"раз":>8} {"сред., мс":>10} '
+                          f'{"p95, мс":>8}  страница / запрос')
+        for row in rows[:options['limit']]:
+            self.stdout.write(
+                f'{row.total_ms:12.1f} {row.count:8d} {row.average_ms:10.2f} '
+                f'{row.p95_ms:8.1f}  {row.view or "-"}\n    {row.sql}')
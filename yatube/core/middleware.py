@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+
+from . import db_router
+from .http import SAFE_METHODS
+
+PIN_COOKIE = 'pin_primary'
+
+
+class ReadReplicaMiddleware:
+    """Направляет чтения страниц из REPLICA_READ_VIEWS на реплику."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.use_primary()
+        if request.method not in SAFE_METHODS:
+            # Короче отставания реплики закрепление не спасает.
+            pin_seconds = max(settings.REPLICA_PIN_SECONDS,
+                              settings.DATABASE_REPLICA_MAX_LAG)
+            response.set_cookie(PIN_COOKIE, str(time.time() + pin_seconds),
+                                max_age=pin_seconds, httponly=True)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in SAFE_METHODS
+                and not self.is_pinned(request)
+                and request.resolver_match.view_name
+                in settings.REPLICA_READ_VIEWS):
+            db_router.use_replica(db_router.choose_replica())
+
+    def is_pinned(self, request):
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryFingerprint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=32, verbose_name='Отпечаток')),
+                ('view', models.CharField(blank=True, max_length=200, verbose_name='Страница')),
+                ('sql', models.TextField(verbose_name='Запрос без литералов')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Выполнений')),
+                ('total_ms', models.FloatField(default=0, verbose_name='Всего, мс')),
+                ('p95_ms', models.FloatField(default=0, verbose_name='p95, мс')),
+                ('histogram', models.TextField(default='', editable=False, verbose_name='Гистограмма')),
+                ('last_seen', models.DateTimeField(auto_now=True, verbose_name='Последнее выполнение')),
+            ],
+            options={
+                'verbose_name': 'Форма запроса',
+                'verbose_name_plural': 'Формы запросов',
+                'ordering': ('-total_ms',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='queryfingerprint',
+            constraint=models.UniqueConstraint(fields=('fingerprint', 'view'), name='query_fingerprint_view_unique'),
+        ),
+    ]
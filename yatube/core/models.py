@@ -0,0 +1,109 @@
+from django.db import models
+from django.utils import timezone
+
+
+class QueryFingerprint(models.Model):
+    """Сводка по форме SQL-запроса на одной странице."""
+    fingerprint = models.CharField('Отпечаток', max_length=32)
+    view = models.CharField('Страница', max_length=200, blank=True)
+    sql = models.TextField('Запрос без литералов')
+    count = models.PositiveIntegerField('Выполнений', default=0)
+    total_ms = models.FloatField('Всего, мс', default=0)
+    p95_ms = models.FloatField('p95, мс', default=0)
+    # Число выполнений по корзинам querylog.BUCKETS_MS через запятую.
+    histogram = models.TextField('Гистограмма', default='', editable=False)
+    last_seen = models.DateTimeField('Последнее выполнение', auto_now=True)
+
+    class Meta:
+        ordering = ('-total_ms',)
+        constraints = [
+            models.UniqueConstraint(fields=['fingerprint', 'view'],
+                                    name='query_fingerprint_view_unique'),
+        ]
+        verbose_name = 'Форма запроса'
+        verbose_name_plural = 'Формы запросов'
+
+    def __str__(self):
+        return self.sql[:50]
+
+    @property
+    def average_ms(self):
+        return self.total_ms / self.count if self.count else 0
+
+
+class OutboxMessage(models.Model):
+    """Письмо, ждущее отправки процессом mail_worker."""
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    subject = models.CharField('Тема', max_length=255, blank=True)
+    recipients = models.TextField('Получатели')
+    # Письмо целиком в JSON, см. core.mail.dump_message.
+    payload = models.TextField('Письмо', editable=False)
+    status = models.CharField('Состояние', max_length=10, choices=STATUSES,
+                              default=PENDING)
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    next_attempt = models.DateTimeField('Следующая попытка',
+                                        default=timezone.now)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    sent = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = [
+            models.Index(fields=['status', 'next_attempt'],
+                         name='outbox_due_idx'),
+        ]
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+
+    def __str__(self):
+        return self.subject[:50]
+
+
+class Task(models.Model):
+    """Фоновая задача для task_worker, см. core.tasks."""
+    QUEUED = 'queued'
+    DONE = 'done'
+    DEAD = 'dead'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (DONE, 'Выполнена'),
+        (DEAD, 'Отложена после ошибок'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    # Аргументы [args, kwargs] в JSON.
+    payload = models.TextField('Аргументы', default='[[], {}]')
+    priority = models.SmallIntegerField('Приоритет', default=0)
+    status = models.CharField('Состояние', max_length=10, choices=STATUSES,
+                              default=QUEUED)
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Наибольшее число попыток')
+    # Для взятой задачи — конец аренды: после него задачу возьмёт другой
+    # процесс.
+    run_after = models.DateTimeField('Не раньше', default=timezone.now)
+    locked_by = models.CharField('Взята', max_length=64, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_after'],
+                         name='task_due_idx'),
+            models.Index(fields=['locked_by'], name='task_locked_by_idx'),
+        ]
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self):
+        return self.name
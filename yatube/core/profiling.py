@@ -0,0 +1,144 @@
+"""Профилирование запросов: время SQL, шаблонов и Python.
+
+Итог уходит в заголовок Server-Timing и одной строкой JSON в логгер
+yatube.profiling. Доля PROFILING_SAMPLE_RATE запросов дополнительно
+профилируется cProfile, дамп пишется в PROFILING_DUMP_DIR.
+
+Выключенная PROFILING_ENABLE middleware не попадает в цепочку вовсе,
+а обёртка шаблонов ставится только при включённой.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger('yatube.profiling')
+
+_state = threading.local()
+
+
+class Timings:
+    def __init__(self):
+        self.sql_count = 0
+        self.sql = 0.0
+        self.sql_in_template = 0.0
+        self.template = 0.0
+        self.template_depth = 0
+
+
+def current():
+    return getattr(_state, 'timings', None)
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    timings = current()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        timings.sql_count += 1
+        timings.sql += elapsed
+        if timings.template_depth:
+            timings.sql_in_template += elapsed
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        timings = current()
+        if timings is None:
+            return render(self, context)
+        # Вложенные шаблоны (include, карточки) входят во внешний.
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timings.template_depth -= 1
+            if not timings.template_depth:
+                timings.template += time.perf_counter() - started
+    wrapper.profiled = True
+    return wrapper
+
+
+def install_template_timer():
+    if not getattr(Template.render, 'profiled', False):
+        Template.render = _timed_render(Template.render)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def dump_name(request):
+    path = re.sub(r'[^\w]+', '-', request.path).strip('-') or 'root'
+    return f'{time.time():.6f}-{request.method}-{path}.prof'
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLE:
+            raise MiddlewareNotUsed
+        install_template_timer()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = _state.timings = Timings()
+        profiler = None
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(sql_wrapper))
+                if profiler:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler:
+                        profiler.disable()
+        finally:
+            _state.timings = None
+        total = time.perf_counter() - started
+        template = timings.template - timings.sql_in_template
+        python = total - timings.sql - template
+        response['Server-Timing'] = ', '.join((
+            f'sql;dur={_ms(timings.sql)};desc="{timings.sql_count} queries"',
+            f'tpl;dur={_ms(template)}',
+            f'py;dur={_ms(python)}',
+            f'total;dur={_ms(total)}',
+        ))
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'total_ms': _ms(total),
+            'sql_ms': _ms(timings.sql),
+            'sql_count': timings.sql_count,
+            'template_ms': _ms(template),
+            'python_ms': _ms(python),
+        }
+        if profiler:
+            record['profile'] = self.dump(profiler, request)
+        logger.info(json.dumps(record, ensure_ascii=False))
+        return response
+
+    def dump(self, profiler, request):
+        os.makedirs(settings.PROFILING_DUMP_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILING_DUMP_DIR, dump_name(request))
+        profiler.dump_stats(path)
+        return path
@@ -0,0 +1,242 @@
+"""Сводка SQL-запросов по формам и журнал медленных запросов.
+
+Запрос приводится к отпечатку: литералы заменяются на ?, списки IN
+сворачиваются, поэтому запросы одной формы складываются вместе. Каждый
+процесс копит число выполнений, общее время и гистограмму по отпечатку
+и странице и раз в QUERYLOG_FLUSH_SECONDS сбрасывает их в
+QueryFingerprint. Запросы дольше QUERYLOG_SLOW_MS пишутся в логгер
+yatube.querylog вместе с планом EXPLAIN QUERY PLAN.
+
+Счётчики строк прибавляются через F(), гистограмма сливается под
+блокировкой записи, так что процессы не теряют данные друг друга.
+Неудачный сброс не ломает запрос: накопленное возвращается в очередь
+до следующего раза.
+"""
+import bisect
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import QueryFingerprint
+from .sqlite import reserve_write, retry_locked
+
+logger = logging.getLogger('yatube.querylog')
+
+BUCKETS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000,
+              5000, float('inf'))
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'(?<![\w".])-?\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+SPACE_RE = re.compile(r'\s+')
+
+_state = threading.local()
+_lock = threading.Lock()
+_pending = {}
+_last_flush = [time.monotonic()]
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """(md5, нормализованный текст) запроса без литералов."""
+    normalized = STRING_RE.sub('?', sql)
+    normalized = NUMBER_RE.sub('?', normalized)
+    normalized = IN_LIST_RE.sub('IN (...)', normalized)
+    normalized = SPACE_RE.sub(' ', normalized).strip()
+    return hashlib.md5(normalized.encode()).hexdigest(), normalized
+
+
+def tracked(sql):
+    tables = settings.QUERYLOG_TABLES
+    return not tables or any(f'"{table}"' in sql for table in tables)
+
+
+def bucket(ms):
+    return bisect.bisect_left(BUCKETS_MS, ms)
+
+
+def percentile(histogram, percent):
+    """Верхняя граница корзины, в которую попадает перцентиль."""
+    total = sum(histogram)
+    if not total:
+        return 0
+    threshold = total * percent / 100
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if seen >= threshold:
+            limit = BUCKETS_MS[index]
+            return limit if limit != float('inf') else BUCKETS_MS[-2]
+    return 0
+
+
+def explain(connection, sql, params):
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    prefix = ('EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite'
+              else 'EXPLAIN ')
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return [' '.join(str(column) for column in row)
+                for row in cursor.fetchall()]
+
+
+def capture(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        ms = (time.perf_counter() - started) * 1000
+        if not getattr(_state, 'explaining', False) and tracked(sql):
+            _state.queries.append((sql, ms))
+            if ms > settings.QUERYLOG_SLOW_MS:
+                log_slow(context['connection'], sql, params, ms)
+
+
+def log_slow(connection, sql, params, ms):
+    _state.explaining = True
+    try:
+        plan = explain(connection, sql, params)
+    except Exception:
+        plan = None
+    finally:
+        _state.explaining = False
+    logger.warning(json.dumps({
+        'fingerprint': fingerprint(sql)[0],
+        'view': getattr(_state, 'view', None),
+        'ms': round(ms, 2),
+        'sql': sql,
+        'plan': plan,
+    }, ensure_ascii=False, default=str))
+
+
+def _aggregate(key, sql):
+    aggregate = _pending.get(key)
+    if aggregate is None:
+        aggregate = _pending[key] = {
+            'sql': sql, 'count': 0, 'total_ms': 0.0,
+            'histogram': [0] * len(BUCKETS_MS)}
+    return aggregate
+
+
+def record(view, queries):
+    with _lock:
+        for sql, ms in queries:
+            digest, normalized = fingerprint(sql)
+            aggregate = _aggregate((digest, view), normalized)
+            aggregate['count'] += 1
+            aggregate['total_ms'] += ms
+            aggregate['histogram'][bucket(ms)] += 1
+
+
+def _restore(pending):
+    """Возвращает несохранённое накопленное в очередь процесса."""
+    with _lock:
+        for key, saved in pending.items():
+            aggregate = _aggregate(key, saved['sql'])
+            aggregate['count'] += saved['count']
+            aggregate['total_ms'] += saved['total_ms']
+            aggregate['histogram'] = [
+                old + new for old, new
+                in zip(aggregate['histogram'], saved['histogram'])]
+
+
+def _merge_histogram(stored, added):
+    histogram = ([int(count) for count in stored.split(',') if count]
+                 or [0] * len(BUCKETS_MS))
+    return [old + new for old, new in zip(histogram, added)]
+
+
+def _save(digest, view, aggregate):
+    rows = QueryFingerprint.objects.filter(fingerprint=digest, view=view)
+    increments = {
+        'count': F('count') + aggregate['count'],
+        'total_ms': F('total_ms') + aggregate['total_ms'],
+        'last_seen': timezone.now(),
+    }
+    if not rows.update(**increments):
+        histogram = aggregate['histogram']
+        try:
+            with transaction.atomic():
+                QueryFingerprint.objects.create(
+                    fingerprint=digest, view=view, sql=aggregate['sql'],
+                    count=aggregate['count'],
+                    total_ms=aggregate['total_ms'],
+                    histogram=','.join(str(count) for count in histogram),
+                    p95_ms=percentile(histogram, 95))
+            return
+        except IntegrityError:
+            # Строку только что создал другой процесс.
+            rows.update(**increments)
+    stored = rows.select_for_update().values_list('histogram', flat=True)
+    histogram = _merge_histogram(stored.get(), aggregate['histogram'])
+    rows.update(histogram=','.join(str(count) for count in histogram),
+                p95_ms=percentile(histogram, 95))
+
+
+def _write(pending):
+    with transaction.atomic():
+        # Под блокировкой записи гистограмму никто не изменит между
+        # чтением и записью.
+        reserve_write()
+        for (digest, view), aggregate in pending.items():
+            _save(digest, view, aggregate)
+
+
+def flush():
+    """Сбрасывает накопленное процессом в QueryFingerprint.
+
+    Возвращает число записанных строк; при ошибке базы данные
+    остаются в очереди, а ошибка уходит в лог.
+    """
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush[0] = time.monotonic()
+    if not pending:
+        return 0
+    try:
+        retry_locked(lambda: _write(pending))
+    except DatabaseError:
+        logger.exception('Сводка запросов не записана')
+        _restore(pending)
+        return 0
+    return len(pending)
+
+
+class QueryLogMiddleware:
+    def __init__(self, get_response):
+        if not settings.QUERYLOG_ENABLE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.queries = []
+        _state.view = None
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(capture))
+                response = self.get_response(request)
+            record(_state.view or '', _state.queries)
+        finally:
+            _state.queries = []
+        if (time.monotonic() - _last_flush[0]
+                >= settings.QUERYLOG_FLUSH_SECONDS):
+            flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.view = request.resolver_match.view_name
@@ -0,0 +1,176 @@
+"""Ограничение частоты запросов скользящим окном поверх CACHES.
+
+Окно оценивается по двум счётчикам фиксированных окон, текущему и
+предыдущему: предыдущий учитывается с весом той доли, которую скользящее
+окно ещё перекрывает. На запрос приходится одно чтение get_many и по
+одному incr на лимит, сколько бы запросов ни было в окне.
+
+Адрес клиента за обратным прокси из TRUSTED_PROXIES берётся из
+X-Forwarded-For: справа налево до первого адреса не из доверенных.
+"""
+import inspect
+import ipaddress
+import math
+import time
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .views import too_many_requests
+
+UNITS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60), '100/12h' -> (100, 43200)."""
+    limit, period = rate.split('/')
+    count = int(period[:-1] or 1)
+    return int(limit), count * UNITS[period[-1]]
+
+
+def _is_trusted(address, networks):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def client_ip(request):
+    """Адрес клиента с учётом доверенных прокси.
+
+    Левую часть X-Forwarded-For клиент может подделать, поэтому
+    цепочка читается справа: каждый доверенный прокси дописал адрес
+    того, кто к нему пришёл.
+    """
+    address = request.META.get('REMOTE_ADDR', '')
+    networks = [ipaddress.ip_network(proxy, strict=False)
+                for proxy in settings.TRUSTED_PROXIES]
+    if not networks or not _is_trusted(address, networks):
+        return address
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    for hop in reversed([hop.strip() for hop in forwarded.split(',')]):
+        if not hop:
+            continue
+        address = hop
+        if not _is_trusted(hop, networks):
+            break
+    return address
+
+
+def identity(request, key):
+    """Кого считаем: пользователя или адрес; гостя всегда по адресу."""
+    if key == 'user' and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+def hit(scope, limit, window, now=None):
+    """Учитывает запрос и возвращает 0 или сколько секунд ждать."""
+    return hit_many([(scope, limit, window)], now)
+
+
+def _window_keys(scope, window, now):
+    current = int(now // window)
+    return (f'ratelimit:{scope}:{current - 1}',
+            f'ratelimit:{scope}:{current}', now / window - current)
+
+
+def hit_many(limits, now=None):
+    """Сверяет запрос со всеми лимитами (scope, limit, window) и
+    засчитывает его в каждый, только если ни один не исчерпан.
+
+    Возвращает 0 или наибольшее из ожиданий.
+    """
+    now = time.time() if now is None else now
+    windows = [_window_keys(scope, window, now)
+               for scope, limit, window in limits]
+    counts = cache.get_many([key for previous_key, current_key, elapsed
+                             in windows
+                             for key in (previous_key, current_key)])
+    wait = 0
+    for (scope, limit, window), (previous_key, current_key, elapsed) in zip(
+            limits, windows):
+        previous = counts.get(previous_key, 0)
+        used = counts.get(current_key, 0)
+        if previous * (1 - elapsed) + used + 1 > limit:
+            wait = max(wait, retry_after(previous, used, limit, window,
+                                         elapsed))
+    if wait:
+        return wait
+    for (scope, limit, window), (previous_key, current_key, elapsed) in zip(
+            limits, windows):
+        try:
+            cache.incr(current_key)
+        except ValueError:
+            cache.set(current_key, 1, 2 * window)
+    return 0
+
+
+def retry_after(previous, used, limit, window, elapsed):
+    if used + 1 > limit:
+        # Текущее окно уже исчерпано, ждать до следующего.
+        wait = 1 - elapsed
+    else:
+        # Ждём, пока вес предыдущего окна не упадёт достаточно.
+        wait = 1 - (limit - used - 1) / previous - elapsed
+    # Округляем, чтобы погрешность float не добавляла лишнюю секунду.
+    return max(1, math.ceil(round(wait * window, 6)))
+
+
+def view_name(view):
+    """Имя view для ключа лимита, под любыми декораторами.
+
+    method_decorator передаёт связанный метод в partial, поверх него
+    могут стоять другие декораторы с wraps; метод называется по классу
+    экземпляра, а не по классу, где он объявлен.
+    """
+    while True:
+        if isinstance(view, partial):
+            view = view.func
+        elif (hasattr(view, '__wrapped__')
+              and not inspect.ismethod(view)):
+            view = view.__wrapped__
+        else:
+            break
+    if inspect.ismethod(view):
+        owner = type(view.__self__)
+        return f'{owner.__module__}.{owner.__qualname__}.{view.__name__}'
+    return f'{view.__module__}.{view.__qualname__}'
+
+
+def ratelimit(key, rate, methods=('POST',)):
+    """Не больше rate запросов methods к view от пользователя или адреса.
+
+    key — 'user' или 'ip', rate — строка вида '10/m'. Лимиты разных
+    view и разных декораторов на одной view считаются отдельно.
+    Декораторы, стоящие подряд, сливаются в одну проверку: отказ по
+    одному лимиту не расходует остальные.
+    """
+    limit, window = parse_rate(rate)
+
+    def decorator(view):
+        state = getattr(view, 'ratelimits', None)
+        if state is not None and state[0] is view:
+            # Под нами такой же декоратор: проверяем его лимиты вместе.
+            _, view, limits = state
+        else:
+            limits = []
+        name = f'{view_name(view)}:{key}:{rate}'
+        limits = [(name, key, limit, window, methods)] + limits
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.RATELIMIT_ENABLE:
+                wait = hit_many([
+                    (f'{scope}:{identity(request, by)}', count, period)
+                    for scope, by, count, period, verbs in limits
+                    if request.method in verbs
+                ])
+                if wait:
+                    return too_many_requests(request, wait)
+            return view(request, *args, **kwargs)
+        wrapper.ratelimits = (wrapper, view, limits)
+        return wrapper
+    return decorator
@@ -0,0 +1,98 @@
+"""Профиль SQLite для нескольких WSGI-процессов.
+
+При подключении включаются прагмы из SQLITE_PRAGMAS (WAL, mmap,
+synchronous=NORMAL, busy_timeout). Запись во view, обёрнутых в
+serialized_write, идёт по одной во всех процессах через файловую
+блокировку SQLITE_WRITE_LOCK. Транзакция сразу берёт блокировку записи
+SQLite, и «database is locked» повторяется с нарастающей паузой только
+на этом шаге, до того как view что-либо сделала.
+"""
+import fcntl
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import (DEFAULT_DB_ALIAS, OperationalError, connections,
+                       transaction)
+
+from .http import SAFE_METHODS
+
+# Пустая запись: в начале транзакции она лишь берёт блокировку записи.
+RESERVE_SQL = 'UPDATE django_migrations SET app = app WHERE 0'
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик connection_created: прагмы для каждого соединения."""
+    if connection.vendor == 'sqlite' and settings.SQLITE_PRAGMAS:
+        with connection.cursor() as cursor:
+            apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
+
+
+@contextmanager
+def write_lock(path):
+    """Эксклюзивная блокировка файла path, общая для всех процессов."""
+    if not path:
+        yield
+        return
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def is_locked_error(error):
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+def retry_locked(func, retries=None, backoff=None):
+    """Вызывает func, повторяя его при занятой базе."""
+    retries = settings.SQLITE_WRITE_RETRIES if retries is None else retries
+    backoff = settings.SQLITE_WRITE_BACKOFF if backoff is None else backoff
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except OperationalError as error:
+            if attempt == retries or not is_locked_error(error):
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def reserve_write(using=DEFAULT_DB_ALIAS):
+    """Берёт блокировку записи SQLite в начале текущей транзакции.
+
+    Пока в транзакции ничего не прочитано, занятую базу можно ждать
+    и повторять попытку, не рискуя уже сделанной работой.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+
+    def reserve():
+        with connection.cursor() as cursor:
+            cursor.execute(RESERVE_SQL)
+    retry_locked(reserve)
+
+
+def serialized_write(view):
+    """Выполняет изменяющий запрос в транзакции под общей блокировкой.
+
+    View вызывается один раз: файлы, задачи и прочие побочные действия
+    не повторяются. Повторяется только захват блокировки записи.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        with write_lock(settings.SQLITE_WRITE_LOCK):
+            with transaction.atomic():
+                reserve_write()
+                return view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,185 @@
+"""Статика с отпечатками в именах, заранее сжатая gzip и brotli.
+
+collectstatic с CompressedManifestStaticFilesStorage кладёт в
+STATIC_ROOT копии файлов с хэшем содержимого в имени, манифест
+staticfiles.json и рядом с текстовыми файлами варианты .gz и .br
+(brotli — если установлен одноимённый пакет).
+
+PrecompressedStaticFiles оборачивает WSGI-приложение и отдаёт файлы
+STATIC_ROOT сам: выбирает вариант по Accept-Encoding, а файлам с
+отпечатком ставит кэш на год с immutable — при изменении файла
+меняется и его имя.
+"""
+import gzip
+import json
+import mimetypes
+import os
+from email.utils import formatdate
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.txt', '.json', '.html',
+                '.ico', '.xml')
+# Варианты в порядке предпочтения: расширение файла и Content-Encoding.
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def compress(path):
+    """Пишет path.gz и path.br, если они меньше исходного файла."""
+    with open(path, 'rb') as stream:
+        content = stream.read()
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content)
+    written = []
+    for suffix, data in variants.items():
+        if len(data) < len(content):
+            with open(path + suffix, 'wb') as stream:
+                stream.write(data)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE):
+                for variant in compress(self.path(name)):
+                    yield name, os.path.relpath(variant, self.location), True
+
+    def stored_name(self, name):
+        # До первого collectstatic манифеста нет: отдаём исходное имя,
+        # чтобы страницы рисовались и в тестах, и на свежей копии.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+
+def encoding_qualities(header):
+    """Кодировки из Accept-Encoding с их q; q=0 означает запрет."""
+    qualities = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        value = 1.0
+        if quality.startswith('q='):
+            try:
+                value = float(quality[2:])
+            except ValueError:
+                continue
+        if coding:
+            qualities[coding.strip().lower()] = value
+    return qualities
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, которые клиент не запретил q=0."""
+    return {coding for coding, quality in encoding_qualities(header).items()
+            if quality > 0}
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        self.path = path
+        self.immutable = immutable
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in (
+                'application/javascript', 'application/json'):
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        # Вариант: (путь, размер, ETag, Content-Encoding или None).
+        self.variants = []
+        for suffix, encoding in ENCODINGS + (('', None),):
+            if os.path.exists(path + suffix):
+                stat = os.stat(path + suffix)
+                etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+                self.variants.append(
+                    (path + suffix, stat.st_size, etag, encoding))
+        self.last_modified = formatdate(os.stat(path).st_mtime, usegmt=True)
+        self.compressed = len(self.variants) > 1
+
+    def variant(self, accept_encoding):
+        qualities = encoding_qualities(accept_encoding)
+        for variant in self.variants:
+            encoding = variant[3]
+            # Явный q=0 для кодировки сильнее разрешения через *.
+            if encoding is None or qualities.get(
+                    encoding, qualities.get('*', 0)) > 0:
+                return variant
+        return self.variants[-1]
+
+
+def scan(root, url_prefix):
+    """Файлы STATIC_ROOT по адресам; отпечаток — по манифесту."""
+    manifest = os.path.join(root, 'staticfiles.json')
+    hashed = set()
+    if os.path.exists(manifest):
+        with open(manifest, encoding='utf-8') as stream:
+            hashed = set(json.load(stream).get('paths', {}).values())
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(tuple(suffix for suffix, _ in ENCODINGS)):
+                continue
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            files[url_prefix + relative] = StaticFile(
+                path, relative in hashed)
+    return files
+
+
+class PrecompressedStaticFiles:
+    """WSGI-обёртка, отдающая собранную статику мимо Django."""
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        root = root or settings.STATIC_ROOT
+        prefix = prefix or settings.STATIC_URL
+        # Список файлов собирается один раз: статика меняется только
+        # с collectstatic и перезапуском.
+        self.files = scan(root, prefix) if root and os.path.isdir(root) else {}
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        static_file = self.files.get(environ.get('PATH_INFO', ''))
+        if static_file is None or method not in ('GET', 'HEAD'):
+            return self.application(environ, start_response)
+        return self.serve(static_file, environ, start_response)
+
+    def serve(self, static_file, environ, start_response):
+        path, size, etag, encoding = static_file.variant(
+            environ.get('HTTP_ACCEPT_ENCODING', ''))
+        headers = [
+            ('Cache-Control', IMMUTABLE if static_file.immutable
+             else f'public, max-age={settings.STATIC_CACHE_MAX_AGE}'),
+            ('ETag', etag),
+            ('Last-Modified', static_file.last_modified),
+        ]
+        if static_file.compressed:
+            headers.append(('Vary', 'Accept-Encoding'))
+        if etag in (tag.strip() for tag in
+                    environ.get('HTTP_IF_NONE_MATCH', '').split(',')):
+            start_response('304 Not Modified', headers)
+            return []
+        headers += [('Content-Type', static_file.content_type),
+                    ('Content-Length', str(size))]
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(path, 'rb'), 64 * 1024)
@@ -0,0 +1,273 @@
+"""Фоновые задачи в таблице базы.
+
+Функция с декоратором @task ставится в очередь вызовом .delay(): строка
+Task пишется в текущей транзакции, поэтому откат записи отменяет и
+задачу, а процесс task_worker увидит её только после фиксации.
+
+Рабочие процессы забирают готовые задачи пачками в аренду: задачам
+ставится своя метка и run_after = сейчас + TASK_LEASE. Если процесс
+упал, аренда истекает и задачу берёт другой, так что задача
+выполняется хотя бы один раз и должна выдерживать повтор. Сначала
+берутся задачи с большим priority. Ошибка откладывает задачу с
+удваивающейся паузой, после max_attempts попыток задача остаётся в
+таблице в состоянии dead до ручного requeue_dead(). Туда же попадает
+задача, у которой истекла аренда последней попытки: такая задача
+раз за разом роняет или вешает процесс.
+"""
+import json
+import logging
+import multiprocessing
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, F, Min, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+from .sqlite import retry_locked
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+
+class TaskFunction:
+    def __init__(self, func, priority, max_attempts):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.schedule(args, kwargs)
+
+    def schedule(self, args=(), kwargs=None, priority=None, countdown=0):
+        """Ставит вызов в очередь; countdown — задержка в секундах."""
+        return Task.objects.create(
+            name=self.name,
+            payload=json.dumps([list(args), kwargs or {}]),
+            priority=self.priority if priority is None else priority,
+            max_attempts=(self.max_attempts
+                          or settings.TASK_MAX_ATTEMPTS),
+            run_after=timezone.now() + timedelta(seconds=countdown))
+
+
+def task(func=None, *, priority=0, max_attempts=None):
+    """Регистрирует функцию как фоновую задачу."""
+    def register(func):
+        wrapper = TaskFunction(func, priority, max_attempts)
+        REGISTRY[wrapper.name] = wrapper
+        return wrapper
+    return register(func) if func is not None else register
+
+
+def load_tasks():
+    """Импортирует модули tasks всех приложений, чтобы задачи нашлись."""
+    autodiscover_modules('tasks')
+
+
+def retry_delay(attempts):
+    """Пауза перед повтором: удваивается, но не больше часа."""
+    return timedelta(seconds=min(
+        settings.TASK_RETRY_BACKOFF * 2 ** (attempts - 1), 60 * 60))
+
+
+def _due(now):
+    return Task.objects.filter(status=Task.QUEUED, run_after__lte=now)
+
+
+def bury_exhausted(now=None):
+    """Переводит в dead задачи, чья последняя аренда истекла."""
+    now = now or timezone.now()
+    buried = retry_locked(lambda: _due(now).filter(
+        attempts__gte=F('max_attempts'),
+    ).update(
+        status=Task.DEAD, locked_by='', finished=now,
+        last_error=Concat(F('last_error'), Value(
+            'Аренда последней попытки истекла: процесс не завершил '
+            'задачу.'))))
+    if buried:
+        logger.error('Задач без завершения после всех попыток: %s', buried)
+    return buried
+
+
+def claim(worker, batch_size, now=None):
+    """Берёт в аренду до batch_size готовых задач и возвращает их."""
+    now = now or timezone.now()
+    token = f'{worker}:{uuid.uuid4().hex[:12]}'
+    bury_exhausted(now)
+
+    def take():
+        # Один UPDATE с подзапросом: SQLite сразу берёт блокировку на
+        # запись, и процессы не сталкиваются при её повышении после
+        # чтения. Повторное условие снаружи нужно базам, где подзапрос
+        # может увидеть задачи, уже взятые другим процессом.
+        due = _due(now).filter(attempts__lt=F('max_attempts'))
+        ids = (due.order_by('-priority', 'run_after', 'id')
+               .values('pk')[:batch_size])
+        return due.filter(pk__in=ids).update(
+            locked_by=token, attempts=F('attempts') + 1,
+            run_after=now + timedelta(seconds=settings.TASK_LEASE))
+    if not retry_locked(take):
+        return []
+    return list(Task.objects.filter(locked_by=token)
+                .order_by('-priority', 'run_after', 'id'))
+
+
+def _finish(row, **fields):
+    # Задачу с истёкшей арендой мог взять другой процесс, его запись
+    # не трогаем.
+    retry_locked(lambda: Task.objects.filter(
+        pk=row.pk, locked_by=row.locked_by).update(locked_by='', **fields))
+
+
+def execute(row):
+    """Выполняет взятую задачу; True, если без ошибки.
+
+    Упавшая задача сразу откладывается или уходит в dead, удачные
+    отмечает одним запросом complete().
+    """
+    try:
+        func = REGISTRY.get(row.name)
+        if func is None:
+            raise LookupError(f'Задача {row.name} не зарегистрирована')
+        args, kwargs = json.loads(row.payload)
+        func.func(*args, **kwargs)
+    except Exception:
+        now = timezone.now()
+        error = traceback.format_exc()
+        if row.attempts >= row.max_attempts:
+            logger.exception('Задача %s (%s) отложена после %s попыток',
+                             row.pk, row.name, row.attempts)
+            _finish(row, status=Task.DEAD, finished=now, last_error=error)
+        else:
+            _finish(row, run_after=now + retry_delay(row.attempts),
+                    last_error=error)
+        return False
+    return True
+
+
+def complete(rows):
+    """Отмечает выполненными задачи одной аренды."""
+    if rows:
+        retry_locked(lambda: Task.objects.filter(
+            pk__in=[row.pk for row in rows],
+            locked_by=rows[0].locked_by,
+        ).update(locked_by='', status=Task.DONE, finished=timezone.now()))
+
+
+def work(worker, batch_size=None, interval=1.0, drain=False):
+    """Цикл рабочего процесса: забрать пачку, выполнить, повторить.
+
+    С drain процесс выходит, когда готовых задач не осталось.
+    Возвращает число выполненных и упавших задач.
+    """
+    batch_size = batch_size or settings.TASK_BATCH_SIZE
+    done = failed = 0
+    try:
+        while True:
+            rows = claim(worker, batch_size)
+            if not rows:
+                if drain:
+                    break
+                time.sleep(interval)
+                continue
+            succeeded = [row for row in rows if execute(row)]
+            complete(succeeded)
+            done += len(succeeded)
+            failed += len(rows) - len(succeeded)
+    except KeyboardInterrupt:
+        # Недоделанные задачи вернутся в очередь по истечении аренды.
+        pass
+    return done, failed
+
+
+def _child(number, batch_size, interval, drain, results):
+    # Соединение, унаследованное от родителя, использовать нельзя.
+    connections.close_all()
+    result = (0, 0)
+    try:
+        result = work(f'w{number}', batch_size, interval, drain)
+    finally:
+        # Родитель ждёт ответа от каждого процесса, даже упавшего.
+        results.put(result)
+        connections.close_all()
+
+
+def run_pool(processes, batch_size=None, interval=1.0, drain=False):
+    """Запускает processes рабочих процессов и ждёт их завершения."""
+    load_tasks()
+    if processes <= 1:
+        return work('w0', batch_size, interval, drain)
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    children = [
+        context.Process(target=_child,
+                        args=(number, batch_size, interval, drain, results))
+        for number in range(processes)
+    ]
+    for child in children:
+        child.start()
+    totals = []
+    try:
+        totals = [results.get() for _ in children]
+    except KeyboardInterrupt:
+        pass
+    for child in children:
+        child.join()
+    done, failed = (sum(column) for column in zip(*totals or [(0, 0)]))
+    return done, failed
+
+
+def requeue_dead(name=None):
+    """Возвращает отложенные задачи в очередь с чистым счётом попыток."""
+    dead = Task.objects.filter(status=Task.DEAD)
+    if name:
+        dead = dead.filter(name=name)
+    return dead.update(status=Task.QUEUED, attempts=0, finished=None,
+                       run_after=timezone.now())
+
+
+def purge_done(days):
+    """Удаляет выполненные задачи старше days дней."""
+    deleted, _ = Task.objects.filter(
+        status=Task.DONE,
+        finished__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
+
+
+def queue_state(now=None):
+    """Сводка очереди: задачи по состояниям и ожидание старейшей."""
+    now = now or timezone.now()
+    counts = dict(Task.objects.order_by().values_list('status')
+                  .annotate(count=Count('id')))
+    queued = Task.objects.filter(status=Task.QUEUED)
+    oldest = _due(now).aggregate(oldest=Min('run_after'))['oldest']
+    return {
+        'queued': counts.get(Task.QUEUED, 0),
+        'due': _due(now).count(),
+        'leased': queued.exclude(locked_by='').count(),
+        'done': counts.get(Task.DONE, 0),
+        'dead': counts.get(Task.DEAD, 0),
+        'oldest_due_s': (round((now - oldest).total_seconds(), 1)
+                         if oldest else None),
+        'dead_by_name': dict(
+            Task.objects.filter(status=Task.DEAD).order_by()
+            .values_list('name').annotate(count=Count('id'))),
+    }
+
+
+@task
+def noop(*args, **kwargs):
+    """Пустая задача для замера пропускной способности очереди."""
@@ -0,0 +1,53 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Примесь к TestCase для проверки числа SQL-запросов страницы.
+
+    Каждая страница объявляет бюджет запросов; если страница его
+    превышает, тест падает и показывает все выполненные запросы.
+    """
+
+    def get_with_queries(self, url, client=None):
+        """Запрашивает url и возвращает ответ вместе со списком запросов."""
+        client = client or self.client
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def assertQueryBudget(self, url, budget, client=None):
+        response, queries = self.get_with_queries(url, client)
+        if len(queries) > budget:
+            listing = '\n'.join(
+                f'{number}. {sql}' for number, sql in enumerate(queries, 1))
+            self.fail(f'{url}: {len(queries)} запросов при бюджете '
+                      f'{budget}:\n{listing}')
+        return response
+
+
+class OnCommitMixin:
+    """Примесь к TestCase с captureOnCommitCallbacks из Django 3.2.
+
+    TestCase не фиксирует транзакции, поэтому отложенные через
+    transaction.on_commit действия сами не выполняются.
+    """
+
+    @classmethod
+    @contextmanager
+    def captureOnCommitCallbacks(cls, *, using=DEFAULT_DB_ALIAS,
+                                 execute=False):
+        """Собирает действия on_commit, зарегистрированные в блоке,
+        и с execute выполняет их на выходе."""
+        callbacks = []
+        start_count = len(connections[using].run_on_commit)
+        try:
+            yield callbacks
+        finally:
+            run_on_commit = connections[using].run_on_commit[start_count:]
+            callbacks[:] = [func for sids, func in run_on_commit]
+            if execute:
+                for callback in callbacks:
+                    callback()
@@ -0,0 +1,45 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core import benchmark
+from posts.models import Comment, Group, Post
+from posts.seed import seed
+
+
+class SeedTest(TestCase):
+    def test_seed_fills_models_and_counters(self):
+        """Тест наполнения базы и счётчиков"""
+        seed(users=5, groups=2, posts=30, comments=40, batch_size=7)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 40)
+        self.assertEqual(
+            sum(Group.objects.values_list('posts_count', flat=True)),
+            Post.objects.exclude(group=None).count())
+        self.assertTrue(self.client.login(username='user1',
+                                          password='bench-password'))
+        self.assertEqual(benchmark.dataset_size(),
+                         {'users': 5, 'groups': 2, 'posts': 30})
+
+
+class BenchmarkReportTest(TestCase):
+    def test_percentile(self):
+        """Тест перцентилей по ближайшему рангу"""
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertIsNone(benchmark.percentile([], 95))
+
+    def test_report_merges_workers(self):
+        """Тест сводки результатов нескольких процессов"""
+        parts = [
+            ({'posts:index': [0.01, 0.02]}, {'posts:index': {200: 2}}),
+            ({'posts:index': [0.03]}, {'posts:index': {500: 1}}),
+        ]
+        result = benchmark.report(parts, 1.0, 2, {})
+        index = result['urls']['posts:index']
+        self.assertEqual(index['requests'], 3)
+        self.assertEqual(index['errors'], 1)
+        self.assertEqual(index['p50_ms'], 20.0)
+        self.assertEqual(index['statuses'], {'200': 2, '500': 1})
+        self.assertEqual(result['total']['rps'], 3.0)
@@ -0,0 +1,102 @@
+import gzip
+import zlib
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from core.compression import (CompressionMiddleware, compress_bytes,
+                              compress_chunks)
+from posts.models import Post
+
+FNAME = 0x08
+
+
+class CompressionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer')
+        for number in range(10):
+            Post.objects.create(author=self.user, text=f'Пост {number}' * 20)
+        self.client = Client()
+
+    def test_feed_is_gzipped_when_accepted(self):
+        """Тест сжатия ленты и ослабления ETag"""
+        url = reverse('posts:index')
+        plain = self.client.get(url)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content) / 2)
+        self.assertEqual(int(response['Content-Length']),
+                         len(response.content))
+        # Без CSRF-токена добавки в заголовке нет.
+        self.assertFalse(response.content[3] & FNAME)
+
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip',
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_refused_or_short_responses_stay_plain(self):
+        """Тест отказа от gzip по q=0 и короткого ответа"""
+        response = self.client.get(reverse('posts:index'),
+                                   HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        response = self.client.get(reverse('api:posts') + '?fields=id',
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_csrf_page_is_padded(self):
+        """Тест случайной добавки к странице с CSRF-токеном"""
+        self.client.force_login(self.user)
+        url = reverse('posts:post_detail',
+                      kwargs={'post_id': Post.objects.first().pk})
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIn('csrfmiddlewaretoken',
+                      gzip.decompress(response.content).decode())
+
+        content = b'<p>secret</p>' * 100
+        sizes = {len(compress_bytes(content, padding=100))
+                 for _ in range(20)}
+        self.assertGreater(len(sizes), 1)
+        self.assertLessEqual(max(sizes) - min(sizes), 100)
+        self.assertEqual(gzip.decompress(compress_bytes(content, 100)),
+                         content)
+
+    def test_streaming_chunks_flush_immediately(self):
+        """Тест сжатия потокового ответа по частям"""
+        parts = [b'{"id": %d, "text": "%s"}\n' % (number, b'x' * 300)
+                 for number in range(5)]
+        middleware = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(
+                iter(parts), content_type='application/json'))
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = middleware(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+
+        decoder = zlib.decompressobj(wbits=31)
+        received = b''
+        stream = iter(response.streaming_content)
+        for part in parts:
+            # Каждая сжатая часть раскрывается сразу, без конца потока.
+            received += decoder.decompress(next(stream))
+            self.assertTrue(received.endswith(part))
+        received += decoder.decompress(b''.join(stream))
+        self.assertEqual(received, b''.join(parts))
+
+    def test_other_types_are_skipped(self):
+        """Тест пропуска типов вне COMPRESS_CONTENT_TYPES"""
+        middleware = CompressionMiddleware(
+            lambda request: HttpResponse(b'x' * 1000,
+                                         content_type='image/svg+xml'))
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(middleware(request).has_header('Content-Encoding'))
+        # Пустой поток всё равно даёт корректный gzip.
+        self.assertEqual(gzip.decompress(b''.join(compress_chunks([]))), b'')
@@ -0,0 +1,187 @@
+import time
+from contextlib import ExitStack
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import db_router
+from core.middleware import PIN_COOKIE
+from posts.models import Post
+
+REPLICAS = ['replica1', 'replica2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        db_router.use_primary()
+
+    def test_round_robin_alternates_fresh_replicas(self):
+        """Тест выбора свежих реплик по кругу"""
+        self.assertIsNone(db_router.choose_replica())
+        for alias in REPLICAS:
+            db_router.mark_synced(alias)
+        chosen = {db_router.choose_replica() for _ in range(4)}
+        self.assertEqual(chosen, set(REPLICAS))
+        db_router.mark_synced('replica1', at=0)
+        chosen = {db_router.choose_replica() for _ in range(4)}
+        self.assertEqual(chosen, {'replica2'})
+
+    @override_settings(DATABASE_REPLICA_STRATEGY='least_lag')
+    def test_least_lag_skips_stale_replicas(self):
+        """Тест выбора наименее отстающей реплики"""
+        db_router.mark_synced('replica1', at=0)
+        db_router.mark_synced('replica2')
+        self.assertEqual(db_router.choose_replica(), 'replica2')
+        db_router.mark_synced('replica2', at=0)
+        self.assertIsNone(db_router.choose_replica())
+
+    def test_router_sends_writes_to_primary(self):
+        """Тест того, что записи идут в основную базу"""
+        router = db_router.ReplicaRouter()
+        db_router.use_replica('replica1')
+        self.assertEqual(router.db_for_read(Post), 'replica1')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertFalse(router.allow_migrate('replica1', 'posts'))
+
+    def test_router_reads_users_and_sessions_from_primary(self):
+        """Тест чтения пользователей и сессий с основной базы"""
+        router = db_router.ReplicaRouter()
+        db_router.use_replica('replica1')
+        self.assertEqual(router.db_for_read(User), 'default')
+        self.assertEqual(router.db_for_read(Session), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReadReplicaMiddlewareTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.post = Post.objects.create(author=self.user, text='text')
+
+    def chosen_alias(self, url):
+        seen = []
+        original = db_router.use_replica
+
+        def spy(alias):
+            seen.append(alias)
+            original(alias)
+
+        # Реплики в тестах не настроены, поэтому только запоминаем выбор.
+        with mock.patch.object(db_router, 'use_replica', spy), \
+                mock.patch.object(db_router, 'choose_replica',
+                                  return_value=None):
+            self.client.get(url)
+        return seen
+
+    def test_read_views_use_replica(self):
+        """Тест выбора реплики для страниц чтения"""
+        self.assertEqual(self.chosen_alias(reverse('posts:index')), [None])
+        self.assertEqual(self.chosen_alias(reverse('posts:post_create')), [])
+
+    @override_settings(REPLICA_PIN_SECONDS=5, DATABASE_REPLICA_MAX_LAG=30)
+    def test_post_pins_user_to_primary(self):
+        """Тест закрепления за основной базой после POST"""
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'comment'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        # Закрепление не короче допустимого отставания реплики.
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 30)
+        self.assertEqual(self.chosen_alias(reverse('posts:index')), [])
+        self.assertIsNone(db_router.current_replica())
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRoutingTest(TransactionTestCase):
+    """Настоящие реплики: псевдонимы-зеркала тестовой базы."""
+
+    databases = {'default', *REPLICAS}
+
+    @classmethod
+    def setUpClass(cls):
+        for alias in REPLICAS:
+            connections.databases[alias] = {
+                **connections['default'].settings_dict,
+                'TEST': {'MIRROR': 'default'},
+            }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in REPLICAS:
+            connections[alias].close()
+            del connections.databases[alias]
+            delattr(connections._connections, alias)
+
+    def setUp(self):
+        cache.clear()
+        for alias in REPLICAS:
+            db_router.mark_synced(alias)
+        self.user = User.objects.create_user(username='replicated')
+        self.post = Post.objects.create(author=self.user, text='text')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def aliases_reading_posts(self, url):
+        with ExitStack() as stack:
+            contexts = {
+                alias: stack.enter_context(
+                    CaptureQueriesContext(connections[alias]))
+                for alias in ['default', *REPLICAS]
+            }
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return {alias for alias, context in contexts.items()
+                if any('FROM "posts_post"' in query['sql']
+                       for query in context.captured_queries)}
+
+    def test_read_view_is_served_by_replica(self):
+        """Тест того, что лента читается с одной из реплик"""
+        aliases = self.aliases_reading_posts(reverse('posts:index'))
+        self.assertEqual(len(aliases), 1)
+        self.assertIn(aliases.pop(), REPLICAS)
+        self.assertEqual(
+            self.aliases_reading_posts(
+                reverse('posts:post_edit', kwargs={'post_id': self.post.id})),
+            {'default'})
+
+    def test_post_pins_next_read_to_primary(self):
+        """Тест чтения с основной базы сразу после POST"""
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'comment'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.aliases_reading_posts(reverse('posts:index')),
+                         {'default'})
+
+    def test_replica_read_is_not_cached(self):
+        """Тест того, что страница с реплики не сохраняется под версией"""
+        def stored_pages():
+            # Живые фрагменты лент и карточки постов: нулевой срок
+            # оставляет в LocMemCache уже истёкшую запись.
+            return [key for key in cache._cache
+                    if ('template.cache' in key or 'posts:card' in key)
+                    and cache._expire_info[key] > time.time()]
+
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'text')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(stored_pages(), [])
+
+        self.client.cookies[PIN_COOKIE] = str(time.time() + 60)
+        response = self.client.get(reverse('posts:index'))
+        self.assertTrue(response.has_header('ETag'))
+        self.assertNotEqual(stored_pages(), [])
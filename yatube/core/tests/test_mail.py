@@ -0,0 +1,155 @@
+import fcntl
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import CommandError, call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.mail import outbox_connection, outbox_state, send_batch
+from core.models import OutboxMessage
+
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+FLAKY = 'core.tests.test_mail.FlakyBackend'
+CRASHING = 'core.tests.test_mail.CrashingBackend'
+LOCK_FILE = os.path.join(tempfile.gettempdir(), 'yatube-test-mail.lock')
+
+
+class Crash(BaseException):
+    """Гибель процесса посреди пачки."""
+
+
+class FlakyBackend(EmailBackend):
+    """Почтовый сервер, который отвергает первые failures писем."""
+    failures = 0
+
+    def send_messages(self, messages):
+        if FlakyBackend.failures:
+            FlakyBackend.failures -= 1
+            raise ConnectionError('сервер недоступен')
+        return super().send_messages(messages)
+
+
+class CrashingBackend(EmailBackend):
+    """Почтовый сервер, на котором процесс падает на третьем письме."""
+    sent = 0
+
+    def send_messages(self, messages):
+        if CrashingBackend.sent == 2:
+            raise Crash
+        CrashingBackend.sent += 1
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='core.mail.OutboxBackend',
+                   OUTBOX_EMAIL_BACKEND=LOCMEM, OUTBOX_LOCK_FILE=LOCK_FILE)
+class OutboxTest(TestCase):
+    def setUp(self):
+        FlakyBackend.failures = 0
+        CrashingBackend.sent = 0
+
+    def test_password_reset_is_queued_then_sent(self):
+        """Тест отправки письма сброса пароля через очередь"""
+        User.objects.create_user(username='forgetful',
+                                 email='forgetful@example.com',
+                                 password='forgotten')
+        response = Client().post(reverse('users:password_reset_form'),
+                                 {'email': 'forgetful@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        row = OutboxMessage.objects.get()
+        self.assertEqual(row.recipients, 'forgetful@example.com')
+
+        self.assertEqual(send_batch(outbox_connection()), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['forgetful@example.com'])
+        self.assertIn('forgetful', mail.outbox[0].body)
+        row.refresh_from_db()
+        self.assertEqual(row.status, OutboxMessage.SENT)
+
+    def test_message_survives_round_trip(self):
+        """Тест сохранения всех частей письма в очереди"""
+        message = mail.EmailMultiAlternatives(
+            'Тема', 'Текст', 'site@example.com', ['to@example.com'],
+            bcc=['bcc@example.com'], headers={'X-Tag': 'reset'},
+            reply_to=['help@example.com'])
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.attach('note.txt', 'вложение', 'text/plain')
+        message.send()
+        send_batch(outbox_connection())
+        sent = mail.outbox[0]
+        self.assertEqual(sent.subject, 'Тема')
+        self.assertEqual(sent.recipients(),
+                         ['to@example.com', 'bcc@example.com'])
+        self.assertEqual(sent.extra_headers, {'X-Tag': 'reset'})
+        self.assertEqual(sent.reply_to, ['help@example.com'])
+        self.assertEqual(sent.alternatives, [('<p>Текст</p>', 'text/html')])
+        self.assertEqual(sent.attachments,
+                         [('note.txt', 'вложение', 'text/plain')])
+
+    @override_settings(OUTBOX_EMAIL_BACKEND=FLAKY,
+                       OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_BACKOFF=10)
+    def test_retry_with_backoff_then_give_up(self):
+        """Тест повтора с паузой и отказа после последней попытки"""
+        mail.send_mail('Тема', 'Текст', None, ['to@example.com'])
+        FlakyBackend.failures = 2
+        connection = outbox_connection()
+        self.assertEqual(send_batch(connection), (0, 1))
+        row = OutboxMessage.objects.get()
+        self.assertEqual(row.attempts, 1)
+        self.assertIn('сервер недоступен', row.last_error)
+        self.assertGreater(row.next_attempt,
+                           timezone.now() + timedelta(seconds=9))
+        self.assertEqual(send_batch(connection), (0, 0))
+
+        OutboxMessage.objects.update(next_attempt=timezone.now())
+        with self.assertLogs('core.mail', 'ERROR'):
+            send_batch(connection)
+        row.refresh_from_db()
+        self.assertEqual(row.status, OutboxMessage.FAILED)
+        self.assertEqual(outbox_state()['failed'], 1)
+
+    @override_settings(OUTBOX_EMAIL_BACKEND=FLAKY)
+    def test_worker_drains_in_batches(self):
+        """Тест разбора очереди пачками и отчёта о состоянии"""
+        for number in range(5):
+            mail.send_mail(f'Письмо {number}', 'Текст', None,
+                           [f'to{number}@example.com'])
+        state = outbox_state()
+        self.assertEqual((state['pending'], state['due']), (5, 5))
+        out = StringIO()
+        call_command('mail_worker', once=True, batch_size=2, stdout=out)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(out.getvalue().count('Отправлено'), 3)
+
+        out = StringIO()
+        call_command('mail_worker', state=True, stdout=out)
+        state = json.loads(out.getvalue())
+        self.assertEqual((state['pending'], state['sent']), (0, 5))
+        self.assertIsNone(state['oldest_pending_s'])
+
+    @override_settings(OUTBOX_EMAIL_BACKEND=CRASHING)
+    def test_crash_keeps_sent_messages_marked(self):
+        """Тест того, что падение посреди пачки не повторит отправленное"""
+        for number in range(4):
+            mail.send_mail(f'Письмо {number}', 'Текст', None,
+                           [f'to{number}@example.com'])
+        with self.assertRaises(Crash):
+            send_batch(outbox_connection())
+        self.assertEqual(outbox_state()['sent'], 2)
+        self.assertEqual(outbox_state()['pending'], 2)
+
+    def test_second_worker_refuses_to_start(self):
+        """Тест отказа второго mail_worker"""
+        with open(LOCK_FILE, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with self.assertRaisesMessage(CommandError, 'уже запущен'):
+                call_command('mail_worker', once=True, stdout=StringIO())
+        call_command('mail_worker', once=True, stdout=StringIO())
@@ -0,0 +1,55 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+TEMP_DUMP_DIR = tempfile.mkdtemp()
+
+
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DUMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        user = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=user, text='text')
+        self.url = reverse('posts:post_detail',
+                           kwargs={'post_id': self.post.id})
+
+    @override_settings(PROFILING_ENABLE=False)
+    def test_disabled_middleware_is_skipped(self):
+        """Тест отсутствия замеров при выключенном профилировании"""
+        response = Client().get(self.url)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PROFILING_ENABLE=True, PROFILING_SAMPLE_RATE=0)
+    def test_server_timing_and_log(self):
+        """Тест заголовка Server-Timing и строки лога"""
+        with self.assertLogs('yatube.profiling', 'INFO') as logs:
+            response = Client().get(self.url)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:post_detail')
+        self.assertGreater(record['sql_count'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        timing = response['Server-Timing']
+        self.assertIn(f'desc="{record["sql_count"]} queries"', timing)
+        for metric in ('sql;', 'tpl;', 'py;', 'total;'):
+            self.assertIn(metric, timing)
+        self.assertNotIn('profile', record)
+
+    @override_settings(PROFILING_ENABLE=True, PROFILING_SAMPLE_RATE=1,
+                       PROFILING_DUMP_DIR=TEMP_DUMP_DIR)
+    def test_sampled_request_writes_profile(self):
+        """Тест дампа cProfile для выбранного запроса"""
+        with self.assertLogs('yatube.profiling', 'INFO') as logs:
+            Client().get(self.url)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertTrue(os.path.exists(record['profile']))
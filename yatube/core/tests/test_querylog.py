@@ -0,0 +1,100 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core import querylog
+from core.models import QueryFingerprint
+from posts.models import Post
+
+
+class FingerprintTest(TestCase):
+    def test_literals_and_in_lists_are_stripped(self):
+        """Тест нормализации литералов и списков IN"""
+        first = querylog.fingerprint(
+            'SELECT * FROM "posts_post" WHERE "id" IN (%s, %s) '
+            "AND text = 'a' LIMIT 21")
+        second = querylog.fingerprint(
+            'SELECT  * FROM "posts_post" WHERE "id" IN (%s) '
+            "AND text = 'b''c' LIMIT 5")
+        self.assertEqual(first, second)
+        self.assertEqual(
+            first[1],
+            'SELECT * FROM "posts_post" WHERE "id" IN (...) '
+            'AND text = ? LIMIT ?')
+
+    def test_percentile_of_histogram(self):
+        """Тест p95 по гистограмме"""
+        histogram = [0] * len(querylog.BUCKETS_MS)
+        histogram[querylog.bucket(0.3)] = 95
+        histogram[querylog.bucket(40)] = 5
+        self.assertEqual(querylog.percentile(histogram, 95), 0.5)
+        self.assertEqual(querylog.percentile(histogram, 99), 50)
+
+
+@override_settings(QUERYLOG_ENABLE=True, QUERYLOG_FLUSH_SECONDS=0)
+class QueryLogMiddlewareTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=user, text='text')
+        self.url = reverse('posts:post_detail',
+                           kwargs={'post_id': self.post.id})
+
+    def test_queries_aggregated_per_view(self):
+        """Тест сводки запросов по формам и страницам"""
+        client = Client()
+        client.get(self.url)
+        client.get(self.url)
+        rows = QueryFingerprint.objects.filter(view='posts:post_detail')
+        self.assertTrue(rows.exists())
+        self.assertTrue(all(row.count == 2 for row in rows))
+        # Сессия и пользователь не касаются постов и в сводку не попадают.
+        self.assertTrue(all('"posts_' in row.sql for row in rows))
+
+        out = StringIO()
+        call_command('top_queries', limit=1, stdout=out)
+        self.assertIn('posts:post_detail', out.getvalue())
+
+    @override_settings(QUERYLOG_SLOW_MS=0)
+    def test_slow_queries_logged_with_plan(self):
+        """Тест записи медленного запроса вместе с планом"""
+        with self.assertLogs('yatube.querylog', 'WARNING') as logs:
+            Client().get(self.url)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:post_detail')
+        self.assertTrue(record['plan'])
+
+    def test_flush_adds_to_existing_rows(self):
+        """Тест прибавления счётчиков и гистограммы к имеющейся строке"""
+        querylog.flush()
+        sql = 'SELECT * FROM "posts_post" WHERE "id" = 1'
+        querylog.record('posts:index', [(sql, 0.3), (sql, 40)])
+        querylog.flush()
+        querylog.record('posts:index', [(sql, 0.3)])
+        self.assertEqual(querylog.flush(), 1)
+        row = QueryFingerprint.objects.get(view='posts:index')
+        self.assertEqual(row.count, 3)
+        self.assertAlmostEqual(row.total_ms, 40.6)
+        histogram = [int(count) for count in row.histogram.split(',')]
+        self.assertEqual(histogram[querylog.bucket(0.3)], 2)
+        self.assertEqual(histogram[querylog.bucket(40)], 1)
+
+    @override_settings(SQLITE_WRITE_RETRIES=0)
+    def test_failed_flush_keeps_data_and_response(self):
+        """Тест того, что ошибка записи сводки не ломает страницу"""
+        querylog.flush()
+        locked = OperationalError('database is locked')
+        with mock.patch.object(querylog, '_write', side_effect=locked), \
+                self.assertLogs('yatube.querylog', 'ERROR'):
+            response = Client().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(QueryFingerprint.objects.exists())
+        self.assertTrue(querylog.flush())
+        rows = QueryFingerprint.objects.filter(view='posts:post_detail')
+        self.assertTrue(rows.exists())
+        self.assertTrue(all(row.count == 1 for row in rows))
@@ -0,0 +1,193 @@
+from functools import partial, wraps
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views import View
+
+from core import ratelimit
+from posts.models import Comment, Post
+
+
+class SlidingWindowTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        """Тест разбора строки лимита"""
+        self.assertEqual(ratelimit.parse_rate('10/m'), (10, 60))
+        self.assertEqual(ratelimit.parse_rate('100/12h'), (100, 43200))
+
+    def test_previous_window_is_weighted(self):
+        """Тест учёта предыдущего окна с весом перекрытия"""
+        for _ in range(4):
+            self.assertEqual(ratelimit.hit('scope', 4, 60, now=50), 0)
+        self.assertEqual(ratelimit.hit('scope', 4, 60, now=59), 1)
+        # В середине следующего окна от прошлых 4 запросов остаётся 2.
+        self.assertEqual(ratelimit.hit('scope', 4, 60, now=90), 0)
+        self.assertEqual(ratelimit.hit('scope', 4, 60, now=90), 0)
+        self.assertEqual(ratelimit.hit('scope', 4, 60, now=90), 15)
+        self.assertEqual(ratelimit.hit('scope', 4, 60, now=105), 0)
+
+
+class ClientIpTest(TestCase):
+    def request(self, remote_addr, forwarded=None):
+        extra = {'REMOTE_ADDR': remote_addr}
+        if forwarded is not None:
+            extra['HTTP_X_FORWARDED_FOR'] = forwarded
+        return RequestFactory().get('/', **extra)
+
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        """Тест того, что без доверенных прокси заголовок не читается"""
+        request = self.request('203.0.113.5', '198.51.100.1')
+        self.assertEqual(ratelimit.client_ip(request), '203.0.113.5')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_forwarded_for_is_read_from_the_right(self):
+        """Тест разбора X-Forwarded-For справа до недоверенного адреса"""
+        request = self.request('10.0.0.1',
+                               '192.0.2.66, 198.51.100.1, 10.0.0.2')
+        self.assertEqual(ratelimit.client_ip(request), '198.51.100.1')
+        # Запрос не через прокси: подделанный заголовок не учитывается.
+        request = self.request('203.0.113.5', '198.51.100.1')
+        self.assertEqual(ratelimit.client_ip(request), '203.0.113.5')
+        request = self.request('10.0.0.1')
+        self.assertEqual(ratelimit.client_ip(request), '10.0.0.1')
+
+
+class StackedLimitsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='stacked')
+
+        @ratelimit.ratelimit('user', '2/m')
+        @ratelimit.ratelimit('ip', '1/m')
+        def view(request):
+            return HttpResponse()
+        self.view = view
+
+    def post(self, remote_addr):
+        request = RequestFactory().post('/', REMOTE_ADDR=remote_addr)
+        request.user = self.user
+        return self.view(request).status_code
+
+    def test_rejected_request_spends_no_limit(self):
+        """Тест того, что отказ по одному лимиту не расходует другой"""
+        self.assertEqual(self.post('198.51.100.1'), 200)
+        self.assertEqual(self.post('198.51.100.1'), 429)
+        # Лимит пользователя израсходован одним запросом, а не двумя.
+        self.assertEqual(self.post('198.51.100.2'), 200)
+        self.assertEqual(self.post('198.51.100.3'), 429)
+
+
+def passthrough(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@method_decorator([ratelimit.ratelimit('ip', '1/m'), passthrough],
+                  name='dispatch')
+class FirstView(View):
+    def post(self, request):
+        return HttpResponse()
+
+
+@method_decorator([ratelimit.ratelimit('ip', '1/m'), passthrough],
+                  name='dispatch')
+class SecondView(View):
+    def post(self, request):
+        return HttpResponse()
+
+
+class ViewNameTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_class_based_views_count_separately(self):
+        """Тест отдельных лимитов у разных классов с одним декоратором"""
+        def post(view):
+            request = RequestFactory().post('/')
+            return view.as_view()(request).status_code
+        self.assertEqual([post(FirstView), post(FirstView)], [200, 429])
+        self.assertEqual(post(SecondView), 200)
+
+    def test_view_name_unwraps_decorators(self):
+        """Тест имени view под wraps и method_decorator"""
+        bound = partial(FirstView().dispatch)
+        self.assertEqual(ratelimit.view_name(passthrough(bound)),
+                         f'{__name__}.FirstView.dispatch')
+        self.assertEqual(ratelimit.view_name(passthrough(post_view)),
+                         f'{__name__}.post_view')
+
+
+def post_view(request):
+    return HttpResponse()
+
+
+class RateLimitedViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='spammer')
+        self.post = Post.objects.create(author=self.user, text='text')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_comment_burst_gets_429(self):
+        """Тест ответа 429 с Retry-After на всплеск комментариев"""
+        url = reverse('posts:add_comment', kwargs={'post_id': self.post.id})
+        for i in range(10):
+            self.client.post(url, {'text': f'comment {i}'})
+        response = self.client.post(url, {'text': 'one more'})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(Comment.objects.count(), 10)
+
+        other = Client()
+        other.force_login(User.objects.create_user(username='other'))
+        response = other.post(url, {'text': 'from another user'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_reads_are_not_limited(self):
+        """Тест того, что GET не расходует лимит"""
+        url = reverse('posts:post_create')
+        for _ in range(10):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.post(url, {'text': 'new post'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_signup_limited_by_ip(self):
+        """Тест лимита регистраций с одного адреса"""
+        url = reverse('users:signup')
+        guest = Client()
+        for i in range(5):
+            guest.post(url, {'username': f'user{i}',
+                             'password1': 'Very-secret-123',
+                             'password2': 'Very-secret-123'})
+        response = guest.post(url, {'username': 'user5',
+                                    'password1': 'Very-secret-123',
+                                    'password2': 'Very-secret-123'})
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(User.objects.filter(username='user5').exists())
+
+    @override_settings(TRUSTED_PROXIES=['127.0.0.1'])
+    def test_signup_behind_proxy_limited_per_client(self):
+        """Тест отдельных лимитов для клиентов за обратным прокси"""
+        url = reverse('users:signup')
+        for i in range(5):
+            Client(HTTP_X_FORWARDED_FOR='198.51.100.1').post(url, {
+                'username': f'first{i}',
+                'password1': 'Very-secret-123',
+                'password2': 'Very-secret-123'})
+        response = Client(HTTP_X_FORWARDED_FOR='198.51.100.2').post(url, {
+            'username': 'second', 'password1': 'Very-secret-123',
+            'password2': 'Very-secret-123'})
+        self.assertEqual(response.status_code, 302)
+        response = Client(HTTP_X_FORWARDED_FOR='198.51.100.1').post(url, {
+            'username': 'first5', 'password1': 'Very-secret-123',
+            'password2': 'Very-secret-123'})
+        self.assertEqual(response.status_code, 429)
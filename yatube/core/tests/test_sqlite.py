@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core import sqlite
+
+
+class SqliteProfileTest(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -4000})
+    def test_pragmas_applied_on_connect(self):
+        """Тест прагм для нового соединения"""
+        sqlite.configure_connection(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -4000)
+
+    @override_settings(SQLITE_WRITE_BACKOFF=0)
+    def test_locked_write_is_retried(self):
+        """Тест повтора записи при занятой базе"""
+        func = mock.Mock(side_effect=[
+            OperationalError('database is locked'), 'done'])
+        self.assertEqual(sqlite.retry_locked(func), 'done')
+        self.assertEqual(func.call_count, 2)
+
+        func = mock.Mock(side_effect=OperationalError('no such table'))
+        with self.assertRaises(OperationalError):
+            sqlite.retry_locked(func)
+        self.assertEqual(func.call_count, 1)
+
+    def test_serialized_write_locks_only_writes(self):
+        """Тест блокировки только для изменяющих запросов"""
+        view = sqlite.serialized_write(lambda request: HttpResponse())
+        factory = RequestFactory()
+        with mock.patch.object(sqlite, 'write_lock',
+                               wraps=sqlite.write_lock) as lock:
+            view(factory.get('/'))
+            self.assertFalse(lock.called)
+            view(factory.post('/'))
+            self.assertEqual(lock.call_count, 1)
+
+    @override_settings(SQLITE_WRITE_BACKOFF=0)
+    def test_serialized_write_retries_only_the_lock(self):
+        """Тест повтора захвата блокировки без повторного вызова view"""
+        calls = []
+        view = sqlite.serialized_write(
+            lambda request: calls.append(request) or HttpResponse())
+        retry_locked = sqlite.retry_locked
+        attempts = []
+
+        def locked_once(func):
+            def attempt():
+                attempts.append(func)
+                if len(attempts) == 1:
+                    raise OperationalError('database is locked')
+                return func()
+            return retry_locked(attempt)
+
+        with mock.patch.object(sqlite, 'retry_locked', locked_once):
+            view(RequestFactory().post('/'))
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(len(calls), 1)
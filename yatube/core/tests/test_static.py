@@ -0,0 +1,139 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from django.conf import settings
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.static import (PrecompressedStaticFiles, StaticFile,
+                         accepted_encodings)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SOURCE = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CSS = b'body { color: red; }\n' * 200
+
+
+def django_app(environ, start_response):
+    start_response('404 Not Found', [])
+    return [b'django']
+
+
+@override_settings(STATIC_ROOT=ROOT, STATICFILES_DIRS=[SOURCE])
+class StaticPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(SOURCE, 'css'))
+        with open(os.path.join(SOURCE, 'css', 'site.css'), 'wb') as stream:
+            stream.write(CSS)
+        with override_settings(STATIC_ROOT=ROOT, STATICFILES_DIRS=[SOURCE]):
+            call_command('collectstatic', interactive=False, verbosity=0,
+                         ignore_patterns=['admin'])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(SOURCE, ignore_errors=True)
+        shutil.rmtree(ROOT, ignore_errors=True)
+
+    def get(self, path, **headers):
+        app = PrecompressedStaticFiles(django_app)
+        environ = RequestFactory().get(path, **headers).environ
+        response = {}
+
+        def start_response(status, response_headers):
+            response['status'] = status
+            response['headers'] = dict(response_headers)
+        response['body'] = b''.join(app(environ, start_response))
+        return response
+
+    def test_collect_writes_hashed_names_and_variants(self):
+        """Тест отпечатков в именах и сжатых вариантов"""
+        url = static('css/site.css')
+        self.assertRegex(url, r'^/static/css/site\.[0-9a-f]{12}\.css$')
+        path = os.path.join(ROOT, url[len('/static/'):])
+        with open(path + '.gz', 'rb') as stream:
+            self.assertEqual(gzip.decompress(stream.read()), CSS)
+
+    def test_serves_best_accepted_encoding(self):
+        """Тест выбора варианта по Accept-Encoding"""
+        url = static('css/site.css')
+        response = self.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['status'], '200 OK')
+        self.assertEqual(response['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response['body']), CSS)
+        self.assertEqual(response['headers']['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['headers']['Cache-Control'],
+                         'public, max-age=31536000, immutable')
+
+        response = self.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', response['headers'])
+        self.assertEqual(response['body'], CSS)
+        self.assertEqual(response['headers']['Content-Type'],
+                         'text/css; charset=utf-8')
+
+    @unittest.skipUnless(brotli, 'brotli не установлен')
+    def test_prefers_brotli(self):
+        """Тест отдачи brotli, когда клиент его принимает"""
+        response = self.get(static('css/site.css'),
+                            HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['headers']['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response['body']), CSS)
+
+    def test_conditional_head_and_fallthrough(self):
+        """Тест 304, HEAD, короткого кэша и передачи прочих адресов"""
+        url = static('css/site.css')
+        etag = self.get(url)['headers']['ETag']
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response['status'], '304 Not Modified')
+        self.assertEqual(response['body'], b'')
+
+        app = PrecompressedStaticFiles(django_app)
+        environ = RequestFactory().head(url).environ
+        self.assertEqual(b''.join(app(environ, lambda *args: None)), b'')
+
+        response = self.get('/static/css/site.css')
+        self.assertEqual(response['headers']['Cache-Control'],
+                         f'public, max-age={settings.STATIC_CACHE_MAX_AGE}')
+        self.assertEqual(self.get('/static/css/missing.css')['body'],
+                         b'django')
+        self.assertEqual(self.get('/')['body'], b'django')
+
+    def test_without_manifest_urls_are_plain(self):
+        """Тест исходных имён до первого collectstatic"""
+        with override_settings(STATIC_ROOT=os.path.join(ROOT, 'empty')):
+            self.assertEqual(static('css/site.css'), '/static/css/site.css')
+
+
+class AcceptEncodingTest(TestCase):
+    def test_accepted_encodings(self):
+        """Тест разбора Accept-Encoding с весами"""
+        self.assertEqual(accepted_encodings('gzip, br;q=0.5, deflate;q=0'),
+                         {'gzip', 'br'})
+        self.assertEqual(accepted_encodings(''), set())
+
+    def test_wildcard_keeps_explicit_refusal(self):
+        """Тест запрета кодировки через q=0 рядом с *"""
+        directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'site.css')
+        for suffix in ('', '.gz', '.br'):
+            with open(path + suffix, 'wb') as stream:
+                stream.write(CSS)
+        static_file = StaticFile(path, immutable=False)
+
+        def encoding(header):
+            return static_file.variant(header)[3]
+        self.assertEqual(encoding('*'), 'br')
+        self.assertEqual(encoding('br;q=0, *'), 'gzip')
+        self.assertEqual(encoding('br;q=0, gzip;q=0, *'), None)
+        self.assertEqual(encoding('gzip, *;q=0'), 'gzip')
@@ -0,0 +1,160 @@
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+CALLS = []
+
+
+@tasks.task
+def remember(value, twice=False):
+    CALLS.append(value * 2 if twice else value)
+
+
+@tasks.task(max_attempts=2)
+def broken():
+    raise ValueError('сломано')
+
+
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueue_follows_transaction(self):
+        """Тест отмены задачи вместе с откатом записи"""
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                remember.delay(1)
+                raise RuntimeError
+        self.assertFalse(Task.objects.exists())
+        with transaction.atomic():
+            remember.delay(2, twice=True)
+        self.assertEqual(tasks.work('test', drain=True), (1, 0))
+        self.assertEqual(CALLS, [4])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+
+    def test_priority_and_lease(self):
+        """Тест порядка по приоритету и повторной выдачи по аренде"""
+        remember.delay('low')
+        remember.schedule(['high'], priority=5)
+        remember.schedule(['later'], countdown=60)
+        first = tasks.claim('a', 1)
+        self.assertEqual(json.loads(first[0].payload), [['high'], {}])
+        self.assertEqual(len(tasks.claim('b', 10)), 1)
+        self.assertEqual(tasks.claim('c', 10), [])
+
+        expired = timezone.now() + timedelta(seconds=settings.TASK_LEASE + 1)
+        retaken = tasks.claim('d', 10, now=expired)
+        self.assertEqual(len(retaken), 3)
+        # Работа прежнего владельца аренды не затирает нового.
+        tasks.complete(first)
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 0)
+        tasks.complete(retaken)
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 3)
+
+    @override_settings(TASK_RETRY_BACKOFF=30)
+    def test_retry_then_dead_letter(self):
+        """Тест повтора с паузой, отказа и возврата задачи в очередь"""
+        broken.delay()
+        Task.objects.create(name='missing.task', max_attempts=1)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertEqual(tasks.work('test', drain=True), (0, 2))
+        row = Task.objects.get(name=broken.name)
+        self.assertEqual((row.status, row.attempts), (Task.QUEUED, 1))
+        self.assertIn('сломано', row.last_error)
+        self.assertGreater(row.run_after,
+                           timezone.now() + timedelta(seconds=29))
+
+        Task.objects.filter(pk=row.pk).update(run_after=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.work('test', drain=True)
+        state = tasks.queue_state()
+        self.assertEqual(state['dead'], 2)
+        self.assertEqual(state['dead_by_name'],
+                         {broken.name: 1, 'missing.task': 1})
+
+        self.assertEqual(tasks.requeue_dead(broken.name), 1)
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (Task.QUEUED, 0))
+
+    def test_expired_last_lease_is_dead_lettered(self):
+        """Тест отказа от задачи, которая не завершилась ни разу"""
+        remember.schedule(['hang'])
+        Task.objects.update(max_attempts=2)
+        lease = timedelta(seconds=settings.TASK_LEASE + 1)
+        now = timezone.now()
+        for attempt in range(2):
+            # Процесс взял задачу и погиб, не отметив её.
+            now += lease
+            self.assertEqual(len(tasks.claim(f'w{attempt}', 10, now=now)),
+                             1)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertEqual(tasks.claim('w2', 10, now=now + lease), [])
+        row = Task.objects.get()
+        self.assertEqual((row.status, row.attempts), (Task.DEAD, 2))
+        self.assertIn('Аренда', row.last_error)
+        self.assertEqual(CALLS, [])
+
+    def test_worker_command(self):
+        """Тест команды task_worker: выполнение и состояние очереди"""
+        for value in range(3):
+            remember.delay(value)
+        out = StringIO()
+        call_command('task_worker', processes=1, drain=True, stdout=out)
+        self.assertIn('Выполнено: 3, с ошибкой: 0', out.getvalue())
+        self.assertEqual(sorted(CALLS), [0, 1, 2])
+
+        out = StringIO()
+        call_command('task_worker', state=True, stdout=out)
+        state = json.loads(out.getvalue())
+        self.assertEqual((state['queued'], state['done']), (0, 3))
+
+        Task.objects.update(finished=timezone.now() - timedelta(days=8))
+        call_command('task_worker', purge_days=7, stdout=StringIO())
+        self.assertFalse(Task.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTaskTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_new_image_queues_thumbnail(self):
+        """Тест нарезки миниатюры фоновой задачей"""
+        user = User.objects.create_user(username='painter')
+        post = Post.objects.create(author=user, text='без картинки')
+        self.assertFalse(Task.objects.exists())
+        post.image = SimpleUploadedFile('small.gif', SMALL_GIF,
+                                        content_type='image/gif')
+        post.save()
+        post.text = 'правка текста'
+        post.save()
+        self.assertEqual(Task.objects.get().name,
+                         'posts.tasks.make_post_thumbnail')
+        tasks.work('test', drain=True)
+        post.refresh_from_db()
+        self.assertFalse(post.thumbnail_pending)
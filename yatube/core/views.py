@@ -9,3 +9,11 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def too_many_requests(request, retry_after):
+    template = 'core/429.html'
+    context = {'retry_after': retry_after}
+    response = render(request, template, context, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
@@ -0,0 +1,137 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.db_router import current_replica
+
+# Версия, общая для всех лент: меняется, когда устаревают сразу все
+# страницы, например при переименовании группы.
+ALL_FEEDS = 'all'
+INDEX_FEED = 'index'
+# Версия страниц постов: меняется при правке пользователя, который
+# оставлял комментарии, — его имя есть на чужих страницах.
+COMMENTERS = 'commenters'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def user_version(user_id):
+    # Отдельно от ленты автора: меняется при правке самого пользователя,
+    # а не при каждом его новом посте.
+    return f'user:{user_id}'
+
+
+def _version_key(feed):
+    return f'posts:feed-version:{feed}'
+
+
+def feed_versions(*feeds):
+    """Возвращает текущие версии лент одним запросом к кэшу."""
+    keys = [_version_key(feed) for feed in (ALL_FEEDS,) + feeds]
+    versions = cache.get_many(keys)
+    missing = {key: _initial_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def _initial_version():
+    # Версия, потерянная при вытеснении, не должна совпасть с прежней,
+    # иначе снова станут видны старые фрагменты.
+    return int(time.time() * 1000)
+
+
+def bump_feeds(*feeds):
+    """Меняет версии лент после фиксации текущей транзакции.
+
+    Иначе параллельный запрос успел бы сохранить под новой версией
+    страницу со старыми данными, а откат оставил бы версию сдвинутой.
+    """
+    feeds = set(feeds)
+    transaction.on_commit(lambda: _bump(feeds))
+
+
+def _bump(feeds):
+    for feed in feeds:
+        key = _version_key(feed)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def feed_cache_key(page_obj, *feeds):
+    """Ключ фрагмента ленты: лента, страница или курсор и версии."""
+    versions = '.'.join(str(version) for version in feed_versions(*feeds))
+    return f'{":".join(feeds)}:{page_obj.key}:v{versions}'
+
+
+def make_etag(*parts):
+    raw = '|'.join(str(part) for part in parts)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def replica_read():
+    """Читает ли запрос с реплики, которая может отставать от версий.
+
+    Версии меняются сразу после фиксации, а реплика догоняет основную
+    базу позже. Страницу с реплики нельзя класть в кэш под текущей
+    версией и отдавать с ETag: устаревшая копия пережила бы синхронизацию.
+    """
+    return current_replica() is not None
+
+
+def etags_enabled():
+    """ETag по версиям лент верен, только если версии общие для процессов.
+
+    Иначе процесс, не видевший сброса, отвечал бы 304 без срока.
+    """
+    return settings.FEED_VERSIONS_SHARED and not replica_read()
+
+
+def feed_etag(request, *feeds):
+    """ETag страницы ленты: версии лент, параметры страницы и читатель."""
+    if not etags_enabled():
+        return None
+    return make_etag(*feed_versions(*feeds), request.GET.urlencode(),
+                     request.user.pk)
+
+
+def feed_cache_context(page_obj, *feeds):
+    return {
+        'feed_cache_key': feed_cache_key(page_obj, *feeds),
+        # Нулевой срок: готовый фрагмент читается, новый не сохраняется.
+        'feed_cache_timeout': (0 if replica_read()
+                               else settings.FEED_CACHE_TIMEOUT),
+    }
+
+
+def card_cache_keys(posts, variant):
+    """Ключи карточек: пост, его отметка изменения и версии автора."""
+    author_ids = sorted({post.author_id for post in posts})
+    all_version, *user_versions = feed_versions(
+        *(user_version(author_id) for author_id in author_ids))
+    user_versions = dict(zip(author_ids, user_versions))
+    return [
+        f'posts:card:{variant}:{post.pk}:{post.updated.isoformat()}'
+        f':v{all_version}.{user_versions[post.author_id]}'
+        for post in posts
+    ]
+
+
+def bump_post_feeds(post, old_group_id=None):
+    bump_feeds(INDEX_FEED,
+               author_feed(post.author_id),
+               *(group_feed(group_id)
+                 for group_id in (post.group_id, old_group_id)
+                 if group_id is not None))
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AuthorCounter, Comment, Group, Post
+
+
+def _bump(queryset, field, delta, **extra):
+    """Атомарно меняет счётчик на delta, не опуская его ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta}, **extra)
+
+
+def bump_author_posts(author_id, delta):
+    updated = _bump(AuthorCounter.objects.filter(author_id=author_id),
+                    'posts_count', delta)
+    if not updated and delta > 0:
+        AuthorCounter.objects.get_or_create(
+            author_id=author_id,
+            defaults={'posts_count': Post.objects.filter(
+                author_id=author_id).count()})
+
+
+def bump_group_posts(group_id, delta):
+    if group_id is not None:
+        _bump(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def bump_post_comments(post_id, delta):
+    # Комментарии меняют страницу поста, поэтому двигаем и её отметку
+    # изменения, по которой отвечают на условные запросы.
+    _bump(Post.objects.filter(pk=post_id), 'comments_count', delta,
+          updated=timezone.now())
+
+
+def author_posts_count(author):
+    """Количество постов автора из счётчика, без COUNT(*)."""
+    return (AuthorCounter.objects.filter(author=author)
+            .values_list('posts_count', flat=True).first() or 0)
+
+
+def _count_subquery(model, field):
+    counts = (model.objects.filter(**{field: OuterRef('pk')})
+              .order_by().values(field)
+              .annotate(total=Count('pk')).values('total'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+@transaction.atomic
+def rebuild_counters(batch_size=None):
+    """Пересчитывает все счётчики по фактическим данным."""
+    Group.objects.update(posts_count=_count_subquery(Post, 'group'))
+    Post.objects.update(comments_count=_count_subquery(Comment, 'post'))
+    AuthorCounter.objects.all().delete()
+    rows = (Post.objects.order_by().values('author')
+            .annotate(total=Count('pk')).values_list('author', 'total'))
+    # Без batch_size Django сам выбирает пачку в пределах лимитов SQLite.
+    AuthorCounter.objects.bulk_create(
+        (AuthorCounter(author_id=author_id, posts_count=total)
+         for author_id, total in rows.iterator()),
+        batch_size=batch_size)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import process_pending
+
+
+class Command(BaseCommand):
+    help = 'Нарезает миниатюры для всех ожидающих картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Заново нарезать миниатюры всех картинок')
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        if options['all']:
+            (Post.objects.exclude(image='').exclude(image=None)
+             .update(thumbnail_pending=True))
+        total = 0
+        while True:
+            done = process_pending(options['batch_size'])
+            if not done:
+                break
+            total += done
+        self.stdout.write(self.style.SUCCESS(f'Нарезано миниатюр: {total}'))
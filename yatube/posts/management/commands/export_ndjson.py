@@ -0,0 +1,24 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.ndjson import Progress, export_rows
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты и комментарии '
+            'в NDJSON построчно')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-',
+                            help='Файл для выгрузки, по умолчанию stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        progress = Progress(report=self.stderr.write)
+        if options['path'] == '-':
+            export_rows(sys.stdout, options['chunk_size'], progress)
+        else:
+            with open(options['path'], 'w', encoding='utf-8') as stream:
+                export_rows(stream, options['chunk_size'], progress)
+        self.stderr.write(self.style.SUCCESS(progress.summary()))
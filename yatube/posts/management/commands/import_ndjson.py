@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.ndjson import Importer, Progress
+
+
+class Command(BaseCommand):
+    help = ('Загружает пользователей, группы, посты и комментарии '
+            'из NDJSON пачками')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-',
+                            help='Файл для загрузки, по умолчанию stdin')
+        parser.add_argument('--batch-size', type=int, default=900)
+
+    def handle(self, *args, **options):
+        progress = Progress(report=self.stderr.write)
+        importer = Importer(options['batch_size'], progress)
+        if options['path'] == '-':
+            importer.feed(sys.stdin)
+        else:
+            with open(options['path'], encoding='utf-8') as stream:
+                importer.feed(stream)
+        self.stderr.write(self.style.SUCCESS(progress.summary()))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов'
+
+    def handle(self, *args, **options):
+        if not search.enabled():
+            raise CommandError('Поиск поддерживается только на SQLite')
+        search.rebuild_index(
+            Post.objects.values_list('id', 'text').iterator())
+        self.stdout.write(self.style.SUCCESS('Индекс поиска перестроен'))
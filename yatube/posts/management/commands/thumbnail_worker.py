@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.thumbnails import process_pending
+
+
+class Command(BaseCommand):
+    help = 'Фоновый процесс, который нарезает миниатюры новых картинок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Пауза между опросами пустой очереди, с')
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        self.stdout.write('Ожидаю новые картинки, Ctrl+C для выхода')
+        try:
+            while True:
+                done = process_pending(options['batch_size'])
+                if done:
+                    self.stdout.write(f'Нарезано миниатюр: {done}')
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Остановлено')
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+# Таблица и SQL зафиксированы здесь, чтобы правки posts.search не меняли
+# историческую миграцию. Основы слов берутся из tokenize: индекс обязан
+# совпадать с тем, как разбираются поисковые запросы.
+from posts.search import tokenize
+
+SEARCH_TABLE = 'posts_post_search'
+BATCH_SIZE = 1000
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    posts = (Post.objects.using(connection.alias)
+             .values_list('id', 'text').iterator())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE {SEARCH_TABLE} '
+            f"USING fts5(stems, tokenize='unicode61')")
+        batch = []
+        for post_id, text in posts:
+            batch.append((post_id, ' '.join(tokenize(text))))
+            if len(batch) >= BATCH_SIZE:
+                _insert(cursor, batch)
+                batch = []
+        _insert(cursor, batch)
+
+
+def _insert(cursor, batch):
+    if batch:
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, stems) VALUES (%s, %s)',
+            batch)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_comment_post_created_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
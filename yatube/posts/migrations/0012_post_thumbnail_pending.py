@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+def mark_existing_images(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    (Post.objects.exclude(image='').exclude(image=None)
+     .update(thumbnail_pending=True))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_pending',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Миниатюра ещё не готова'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(thumbnail_pending=True), fields=['id'], name='post_thumbnail_pending_idx'),
+        ),
+        migrations.RunPython(mark_existing_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,199 @@
+"""Потоковый перенос пользователей, групп, постов и комментариев в NDJSON.
+
+Каждая строка файла — одна запись вида {"model": "post", "id": 1, ...}.
+Выгрузка идёт в порядке зависимостей: пользователи, группы, посты,
+комментарии, поэтому загрузка разрешает внешние ключи одним проходом.
+
+Загрузка держит в памяти только текущую пачку и словари id
+пользователей и групп. Постам выдаются id со сдвигом на максимальный id
+в базе, поэтому ссылки комментариев пересчитываются без словаря, и
+память не растёт с числом постов.
+"""
+import json
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from . import cache, counters, search, timeline
+from .models import Comment, Group, Post
+
+User = get_user_model()
+
+USER_FIELDS = ('id', 'username', 'password', 'first_name', 'last_name',
+               'email', 'is_active', 'is_staff', 'is_superuser',
+               'date_joined', 'last_login')
+GROUP_FIELDS = ('id', 'title', 'slug', 'description')
+POST_FIELDS = ('id', 'text', 'pub_date', 'updated', 'author_id', 'group_id',
+               'image')
+COMMENT_FIELDS = ('id', 'post_id', 'author_id', 'text', 'created')
+DATE_FIELDS = ('date_joined', 'last_login', 'pub_date', 'updated',
+               'created')
+
+EXPORTS = (
+    ('user', User, USER_FIELDS),
+    ('group', Group, GROUP_FIELDS),
+    ('post', Post, POST_FIELDS),
+    ('comment', Comment, COMMENT_FIELDS),
+)
+
+
+class Progress:
+    """Считает записи по моделям и скорость в строках в секунду."""
+
+    def __init__(self, report=None, every=100000):
+        self.report = report
+        self.every = every
+        self.counts = {}
+        self.started = time.monotonic()
+
+    def add(self, model, rows=1):
+        before = self.counts.get(model, 0)
+        total = self.counts[model] = before + rows
+        if self.report and total // self.every > before // self.every:
+            self.report(f'{model}: {total} ({self.rate(total):.0f} строк/с)')
+
+    def rate(self, rows):
+        return rows / max(time.monotonic() - self.started, 1e-9)
+
+    def summary(self):
+        total = sum(self.counts.values())
+        parts = ', '.join(f'{model}: {count}'
+                          for model, count in self.counts.items())
+        return f'{parts}; всего {total} ({self.rate(total):.0f} строк/с)'
+
+
+def _dump(row):
+    return json.dumps(
+        {key: value.isoformat() if hasattr(value, 'isoformat') else value
+         for key, value in row.items()},
+        ensure_ascii=False)
+
+
+def export_rows(stream, chunk_size=2000, progress=None):
+    """Пишет все записи в stream построчно, читая базу пачками."""
+    for name, model, fields in EXPORTS:
+        rows = (model.objects.order_by('pk').values(*fields)
+                .iterator(chunk_size=chunk_size))
+        for row in rows:
+            stream.write(_dump({'model': name, **row}) + '\n')
+            if progress:
+                progress.add(name)
+
+
+@contextmanager
+def original_dates(*models):
+    """Отключает auto_now и auto_now_add, чтобы сохранить даты из файла."""
+    fields = [field for model in models for field in model._meta.fields
+              if getattr(field, 'auto_now', False)
+              or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+class Importer:
+    """Загружает записи пачками через bulk_create."""
+
+    def __init__(self, batch_size=900, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.user_ids = {}
+        self.group_ids = {}
+        self.next_user_id = next_id(User)
+        self.next_group_id = next_id(Group)
+        self.post_offset = next_id(Post) - 1
+        self.model = None
+        self.batch = []
+
+    def feed(self, lines):
+        with original_dates(Post, Comment, User):
+            for line in lines:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                model = record.pop('model')
+                if model != self.model or len(self.batch) >= self.batch_size:
+                    self.flush()
+                    self.model = model
+                for field in DATE_FIELDS:
+                    if record.get(field):
+                        record[field] = parse_datetime(record[field])
+                self.batch.append(record)
+            self.flush()
+        self.finish()
+
+    def flush(self):
+        if self.batch:
+            with transaction.atomic():
+                getattr(self, f'_import_{self.model}')(self.batch)
+            if self.progress:
+                self.progress.add(self.model, len(self.batch))
+        self.batch = []
+
+    def _new_ids(self, records, model, key, ids, next_id):
+        """Сопоставляет старые id новым, совпадения ключа берёт из базы."""
+        existing = dict(model.objects.filter(
+            **{f'{key}__in': [record[key] for record in records]}
+        ).values_list(key, 'pk'))
+        fresh = []
+        for record in records:
+            old_id = record.pop('id')
+            if record[key] in existing:
+                ids[old_id] = existing[record[key]]
+                continue
+            ids[old_id] = record['id'] = next_id
+            next_id += 1
+            fresh.append(record)
+        return fresh, next_id
+
+    def _import_user(self, records):
+        fresh, self.next_user_id = self._new_ids(
+            records, User, 'username', self.user_ids, self.next_user_id)
+        User.objects.bulk_create(User(**record) for record in fresh)
+
+    def _import_group(self, records):
+        fresh, self.next_group_id = self._new_ids(
+            records, Group, 'slug', self.group_ids, self.next_group_id)
+        Group.objects.bulk_create(Group(**record) for record in fresh)
+
+    def _import_post(self, records):
+        posts = []
+        for record in records:
+            record['id'] += self.post_offset
+            record['author_id'] = self.user_ids[record['author_id']]
+            if record['group_id'] is not None:
+                record['group_id'] = self.group_ids[record['group_id']]
+            record['thumbnail_pending'] = bool(record['image'])
+            posts.append(Post(**record))
+        Post.objects.bulk_create(posts)
+        if search.enabled():
+            search.index_rows((post.pk, post.text) for post in posts)
+
+    def _import_comment(self, records):
+        comments = []
+        for record in records:
+            del record['id']
+            record['post_id'] += self.post_offset
+            record['author_id'] = self.user_ids[record['author_id']]
+            comments.append(Comment(**record))
+        Comment.objects.bulk_create(comments)
+
+    def finish(self):
+        # bulk_create обходит сигналы: счётчики, ленты подписок и кэш лент
+        # обновляем разом.
+        counters.rebuild_counters()
+        timeline.rebuild_timelines()
+        cache.bump_feeds(cache.ALL_FEEDS)
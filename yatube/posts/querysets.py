@@ -0,0 +1,23 @@
+"""Наборы записей лент, общие для HTML-страниц и JSON API."""
+from .models import Comment, Post, TimelineEntry
+
+
+def index_posts():
+    return Post.objects.select_related('author', 'group')
+
+
+def group_posts(group):
+    return group.posts.select_related('author', 'group')
+
+
+def author_posts(author):
+    return author.posts.select_related('author', 'group')
+
+
+def post_comments(post):
+    return Comment.objects.filter(post=post).select_related('author')
+
+
+def following_entries(user):
+    return (TimelineEntry.objects.filter(user=user)
+            .select_related('post__author', 'post__group'))
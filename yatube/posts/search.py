@@ -0,0 +1,234 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Текст поста разбивается на слова, слова приводятся к основе русским
+стеммером Snowball и складываются в виртуальную таблицу FTS5 с rowid,
+равным id поста. Запрос проходит тот же путь, результаты ранжируются
+встроенной в FTS5 функцией bm25().
+"""
+import base64
+import binascii
+import re
+from functools import lru_cache
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'posts_post_search'
+WORD_RE = re.compile(r'\w+')
+
+VOWELS = 'аеиоуыэюя'
+PERFECTIVE_GERUND = (('в', 'вши', 'вшись'),
+                     ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'))
+ADJECTIVE = ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой',
+             'ем', 'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых',
+             'ую', 'юю', 'ая', 'яя', 'ою', 'ею')
+PARTICIPLE = (('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+REFLEXIVE = ('ся', 'сь')
+VERB = (('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+         'ет', 'ют', 'ны', 'ть', 'ешь', 'нно'),
+        ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+         'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+         'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'))
+NOUN = ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+        'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+        'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+        'ья', 'я')
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+
+def enabled():
+    """Индекс есть только у SQLite, в других базах поиск выключен."""
+    return connection.vendor == 'sqlite'
+
+
+def _after_vowel_consonant(word, start=0):
+    for i in range(start + 1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _strip(word, endings, after_a_or_ya=False):
+    """Снимает самое длинное окончание из endings или возвращает None.
+
+    Окончания первой группы снимаются, только если им предшествует
+    «а» или «я».
+    """
+    for ending in sorted(endings, key=len, reverse=True):
+        if word.endswith(ending):
+            rest = word[:-len(ending)]
+            if after_a_or_ya and not rest.endswith(('а', 'я')):
+                return None
+            return rest
+    return None
+
+
+def _strip_grouped(word, groups):
+    first, second = groups
+    longest = max((ending for ending in first + second
+                   if word.endswith(ending)), key=len, default=None)
+    if longest is None:
+        return None
+    return _strip(word, (longest,), after_a_or_ya=longest in first)
+
+
+def _strip_adjectival(word):
+    rest = _strip(word, ADJECTIVE)
+    if rest is None:
+        return None
+    participle = _strip_grouped(rest, PARTICIPLE)
+    return rest if participle is None else participle
+
+
+def _strip_main(word):
+    """Первый шаг Snowball: деепричастие или возвратность и форма слова."""
+    rest = _strip_grouped(word, PERFECTIVE_GERUND)
+    if rest is not None:
+        return rest
+    rest = _strip(word, REFLEXIVE)
+    if rest is not None:
+        word = rest
+    for rest in (_strip_adjectival(word),
+                 _strip_grouped(word, VERB),
+                 _strip(word, NOUN)):
+        if rest is not None:
+            return rest
+    return word
+
+
+# Частые слова повторяются постоянно, поэтому основы запоминаются.
+@lru_cache(maxsize=65536)
+def stem(word):
+    """Основа русского слова по алгоритму Snowball."""
+    word = word.lower().replace('ё', 'е')
+    rv = next((i + 1 for i, char in enumerate(word) if char in VOWELS),
+              len(word))
+    # Все окончания ищутся внутри RV, поэтому R2 считаем от его начала.
+    r2 = _after_vowel_consonant(word, _after_vowel_consonant(word)) - rv
+    prefix, word = word[:rv], _strip_main(word[rv:])
+    if word.endswith('и'):
+        word = word[:-1]
+    rest = _strip(word[r2:], DERIVATIONAL)
+    if rest is not None:
+        word = word[:r2] + rest
+    rest = _strip(word, SUPERLATIVE)
+    if rest is not None:
+        word = rest
+    if word.endswith('нн'):
+        word = word[:-1]
+    elif rest is None and word.endswith('ь'):
+        word = word[:-1]
+    return prefix + word
+
+
+def tokenize(text):
+    return [stem(word) for word in WORD_RE.findall(text)]
+
+
+def match_expression(query):
+    """Запрос FTS5 из основ слов: все слова обязательны."""
+    stems = dict.fromkeys(tokenize(query))
+    return ' '.join('"{}"'.format(item.replace('"', '""'))
+                    for item in stems if item)
+
+
+def index_post(post):
+    remove_post(post.pk)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, stems) VALUES (%s, %s)',
+            [post.pk, ' '.join(tokenize(post.text))])
+
+
+def remove_post(post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                       [post_id])
+
+
+def index_rows(posts, batch_size=1000):
+    """Добавляет в индекс новые посты из итератора пар (id, text)."""
+    with connection.cursor() as cursor:
+        batch = []
+        for post_id, text in posts:
+            batch.append((post_id, ' '.join(tokenize(text))))
+            if len(batch) >= batch_size:
+                _insert_batch(cursor, batch)
+                batch = []
+        _insert_batch(cursor, batch)
+
+
+def index_stems(rows):
+    """Добавляет в индекс готовые пары (id, основы через пробел)."""
+    with connection.cursor() as cursor:
+        _insert_batch(cursor, rows)
+
+
+def rebuild_index(posts, batch_size=1000):
+    """Перестраивает индекс по итератору пар (id, text)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+    index_rows(posts, batch_size)
+
+
+def _insert_batch(cursor, batch):
+    if batch:
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, stems) VALUES (%s, %s)',
+            batch)
+
+
+def matching_ids(query):
+    """Подзапрос с id постов, подходящих под запрос, без ранжирования."""
+    return RawSQL(
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+        [match_expression(query)])
+
+
+def encode_cursor(rank, post_id):
+    raw = f'{rank!r}|{post_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+        rank, post_id = raw.rsplit('|', 1)
+        return float(rank), int(post_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def ranked_ids(query, after=None, limit=10):
+    """Пары (ранг, id) лучших по BM25 постов после курсора after."""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    sql = (f'SELECT score, rowid FROM ('
+           f'SELECT bm25({SEARCH_TABLE}) AS score, rowid '
+           f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s)')
+    params = [expression]
+    if after is not None:
+        sql += ' WHERE score > %s OR (score = %s AND rowid > %s)'
+        params += [after[0], after[0], after[1]]
+    sql += ' ORDER BY score, rowid LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search_posts(posts, query, after=None, limit=10):
+    """Посты из posts по убыванию релевантности и курсор следующей страницы.
+
+    Курсор кодирует ранг и id последнего поста, поэтому следующая страница
+    продолжает выдачу без OFFSET.
+    """
+    ranked = ranked_ids(query, after, limit + 1)
+    page = ranked[:limit]
+    found = posts.in_bulk([post_id for _, post_id in page])
+    next_cursor = encode_cursor(*page[-1]) if len(ranked) > limit else None
+    return ([found[post_id] for _, post_id in page if post_id in found],
+            next_cursor)
@@ -0,0 +1,296 @@
+"""Генератор синтетических данных для замеров и оценки ёмкости.
+
+Записи получают id сразу за наибольшими в базе, поэтому внешние ключи
+проставляются без чтения базы, а память не растёт с объёмом данных.
+Каждая пачка строится из собственного генератора случайных чисел,
+зависящего только от seed, модели и номера первой записи, поэтому
+результат одинаков при любом числе процессов.
+
+Процессы только строят пачки: готовые значения столбцов и основы
+слов для поиска. Пишет один родительский процесс через executemany
+мимо компилятора запросов Django — у SQLite всё равно один писатель.
+Вторичные индексы постов и комментариев на время загрузки снимаются и
+строятся заново в конце. Модели идут по очереди: пользователи, группы,
+посты, комментарии, так что внешние ключи всегда указывают на уже
+записанные строки.
+"""
+import io
+import multiprocessing
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from PIL import Image
+
+from core.sqlite import retry_locked
+from . import cache, counters, search, timeline
+from .models import Comment, Group, Post
+from .ndjson import next_id
+
+User = get_user_model()
+
+PASSWORD = 'bench-password'
+SPREAD = timedelta(days=365)
+IMAGE_POOL = 20
+
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Дмитрий',
+               'Елена', 'Сергей', 'Наталья', 'Алексей', 'Татьяна',
+               'Михаил', 'Ирина', 'Андрей', 'Светлана', 'Николай')
+LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев',
+              'Петров', 'Соколов', 'Михайлов', 'Новиков', 'Фёдоров',
+              'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семёнов')
+TOPICS = ('Путешествия', 'Кулинария', 'Книги', 'Кино', 'Музыка', 'Спорт',
+          'Наука', 'Программирование', 'Фотография', 'Сад и огород',
+          'История', 'Животные', 'Театр', 'Живопись', 'Рыбалка')
+ADJECTIVES = ('новый', 'старый', 'тихий', 'быстрый', 'светлый', 'тёплый',
+              'большой', 'маленький', 'интересный', 'долгий', 'весёлый',
+              'северный', 'осенний', 'городской', 'удивительный')
+NOUNS = ('город', 'лес', 'дом', 'вечер', 'поезд', 'сад', 'день', 'берег',
+         'рассказ', 'проект', 'рецепт', 'фильм', 'концерт', 'маршрут',
+         'эксперимент', 'двор', 'кофе', 'снег', 'ветер', 'урок')
+VERBS = ('увидел', 'нашёл', 'прочитал', 'приготовил', 'посетил',
+         'написал', 'вспомнил', 'сфотографировал', 'обсудил', 'построил',
+         'услышал', 'попробовал', 'закончил', 'начал', 'показал')
+OPENINGS = ('Сегодня', 'Вчера', 'Наконец', 'Однажды', 'Утром', 'Вечером',
+            'Недавно', 'Летом', 'Зимой', 'В выходные')
+REMARKS = ('Очень советую!', 'Было здорово.', 'Расскажу подробнее позже.',
+           'Кто со мной?', 'Не ожидал такого.', 'Повторю обязательно.')
+REPLIES = ('Согласен!', 'Спасибо, очень полезно.', 'А где это было?',
+           'Отличный пост.', 'Тоже хочу попробовать.', 'Интересно, '
+           'продолжайте.', 'Не согласен, но любопытно.', 'Класс!')
+
+
+def sentence(rng):
+    return (f'{rng.choice(OPENINGS)} я {rng.choice(VERBS)} '
+            f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}, '
+            f'а потом {rng.choice(VERBS)} {rng.choice(ADJECTIVES)} '
+            f'{rng.choice(NOUNS)}.')
+
+
+def russian_text(rng, min_sentences=1, max_sentences=6):
+    parts = [sentence(rng)
+             for _ in range(rng.randint(min_sentences, max_sentences))]
+    if rng.random() < 0.5:
+        parts.append(rng.choice(REMARKS))
+    return ' '.join(parts)
+
+
+def spread_date(rng, now, spread=SPREAD):
+    """Дата в пределах spread назад; свежих записей больше, чем старых."""
+    return now - spread * rng.random() ** 2
+
+
+def image_pool(size=IMAGE_POOL, seed_value=0):
+    """Сохраняет size картинок-градиентов и возвращает их имена."""
+    rng = random.Random(f'{seed_value}:images')
+    names = []
+    for number in range(size):
+        start = [rng.randrange(256) for _ in range(3)]
+        image = Image.new('RGB', (960, 339), tuple(start))
+        stripe = Image.new('RGB', (480, 339),
+                           tuple(255 - value for value in start))
+        image.paste(stripe, (rng.randrange(480), 0))
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=80)
+        names.append(default_storage.save(f'posts/seed-{number}.jpg',
+                                          ContentFile(buffer.getvalue())))
+    return names
+
+
+# Фабрики возвращают готовые значения столбцов по attname, остальные
+# столбцы берут значения по умолчанию из полей модели. Даты приходят
+# в базу строкой, как их записывает бэкенд SQLite.
+
+def _user(rng, pk, options):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    if first.endswith('а') or first.endswith('я'):
+        last += 'а'
+    return {'id': pk, 'username': f'user{pk}',
+            'password': options['password'],
+            'first_name': first, 'last_name': last,
+            'email': f'user{pk}@example.com',
+            'date_joined': str(spread_date(rng, options['now']))}
+
+
+def _group(rng, pk, options):
+    topic = TOPICS[(pk - 1) % len(TOPICS)]
+    return {'id': pk, 'title': f'{topic} #{pk}', 'slug': f'group{pk}',
+            'description': f'Всё о теме «{topic}». {sentence(rng)}'}
+
+
+def _post(rng, pk, options):
+    pub_date = str(spread_date(rng, options['now']))
+    groups = options['groups']
+    image = ''
+    if options['images'] and rng.random() < options['image_share']:
+        image = rng.choice(options['images'])
+    offsets = options['offsets']
+    return {'id': pk, 'text': russian_text(rng),
+            'author_id': offsets['user'] + rng.randint(1, options['users']),
+            'group_id': (offsets['group'] + rng.randint(1, groups)
+                         if groups and rng.random() < 0.8 else None),
+            'pub_date': pub_date, 'updated': pub_date, 'image': image,
+            'thumbnail_pending': bool(image)}
+
+
+def _comment(rng, pk, options):
+    offsets = options['offsets']
+    return {'id': pk,
+            'post_id': offsets['post'] + rng.randint(1, options['posts']),
+            'author_id': offsets['user'] + rng.randint(1, options['users']),
+            'text': rng.choice(REPLIES),
+            'created': str(spread_date(rng, options['now']))}
+
+
+FACTORIES = {
+    'user': (User, _user),
+    'group': (Group, _group),
+    'post': (Post, _post),
+    'comment': (Comment, _comment),
+}
+
+
+def build_chunk(task):
+    """Строит строки модели с номерами из [start, stop) для INSERT.
+
+    Для постов сразу считаются основы слов поискового индекса.
+    """
+    name, start, stop, options = task
+    model, factory = FACTORIES[name]
+    offset = options['offsets'][name]
+    rng = random.Random(f'{options["seed"]}:{name}:{start}')
+    fields = model._meta.concrete_fields
+    defaults = {field.attname: field.get_db_prep_save(field.get_default(),
+                                                      connection)
+                for field in fields}
+    rows, stems = [], []
+    for number in range(start, stop):
+        values = {**defaults, **factory(rng, offset + number, options)}
+        rows.append(tuple(values[field.attname] for field in fields))
+        if model is Post and options['search']:
+            stems.append((values['id'],
+                          ' '.join(search.tokenize(values['text']))))
+    return name, rows, stems
+
+
+def _insert_sql(model):
+    quote = connection.ops.quote_name
+    fields = model._meta.concrete_fields
+    columns = ', '.join(quote(field.column) for field in fields)
+    values = ', '.join(['%s'] * len(fields))
+    return f'INSERT INTO {quote(model._meta.db_table)} ({columns}) ' \
+        f'VALUES ({values})'
+
+
+def write_chunk(name, rows, stems):
+    """Записывает готовые строки пачки одной транзакцией."""
+    sql = _insert_sql(FACTORIES[name][0])
+
+    def write():
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+            search.index_stems(stems)
+    retry_locked(write)
+    return len(rows)
+
+
+@contextmanager
+def deferred_indexes(*models):
+    """Снимает вторичные индексы таблиц на время загрузки.
+
+    Вставка вразброс по B-деревьям индексов на сотнях тысяч строк
+    дороже, чем построить каждый индекс заново одной сортировкой.
+    Уникальность, объявленная в таблице, проверяется и без них.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+            'AND sql IS NOT NULL AND tbl_name IN (%s)'
+            % ', '.join(['%s'] * len(tables)), tables)
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for _, sql in indexes:
+                cursor.execute(sql)
+
+
+def _tasks(name, total, batch_size, options):
+    return [(name, start, min(start + batch_size, total + 1), options)
+            for start in range(1, total + 1, batch_size)]
+
+
+def _close_connections():
+    # Соединение, унаследованное от родителя, использовать нельзя.
+    connections.close_all()
+
+
+def seed(users, groups, posts, comments, batch_size=5000, seed_value=0,
+         progress=None, workers=1, image_share=0.0):
+    """Добавляет в базу пользователей user<id> с паролем PASSWORD, группы
+    group<id>, посты и комментарии со случайными авторами из новых
+    пользователей. id продолжают наибольшие id в базе.
+
+    image_share — доля постов с картинкой из общего набора IMAGE_POOL,
+    миниатюры к ним нарежет thumbnail_worker.
+    """
+    options = {
+        'seed': seed_value,
+        # Наивное время в часовом поясе базы, как его хранит бэкенд.
+        'now': (timezone.make_naive(timezone.now(), connection.timezone)
+                if settings.USE_TZ else timezone.now()),
+        'password': make_password(PASSWORD),
+        'users': users,
+        'groups': groups,
+        'posts': posts,
+        'image_share': image_share,
+        'images': image_pool(seed_value=seed_value) if image_share else [],
+        'offsets': {name: next_id(model) - 1
+                    for name, (model, _) in FACTORIES.items()},
+        'search': search.enabled(),
+    }
+    phases = [
+        _tasks('user', users, batch_size, options),
+        _tasks('group', groups, batch_size, options),
+        _tasks('post', posts if users else 0, batch_size, options),
+        _tasks('comment', comments if users and posts else 0, batch_size,
+               options),
+    ]
+    if workers > 1:
+        connections.close_all()
+        pool = multiprocessing.get_context('fork').Pool(
+            workers, initializer=_close_connections)
+        run = pool.imap_unordered
+    else:
+        pool, run = None, map
+    try:
+        with deferred_indexes(Post, Comment):
+            for tasks in phases:
+                # Процессы строят следующие пачки, пока эта пишется.
+                for name, rows, stems in run(build_chunk, tasks):
+                    written = write_chunk(name, rows, stems)
+                    if progress:
+                        progress.add(name, written)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    # bulk_create обходит сигналы, поэтому счётчики и ленты собираем разом.
+    counters.rebuild_counters()
+    timeline.rebuild_timelines()
+    cache.bump_feeds(cache.ALL_FEEDS)
@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache, counters, search, tasks, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    image = instance.image.name or None
+    if image != (getattr(instance, '_loaded_image', None) or None):
+        # Миниатюру нарежет thumbnail_worker, до тех пор шаблоны
+        # показывают заглушку.
+        instance.thumbnail_pending = image is not None
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    with transaction.atomic():
+        old_group_id = getattr(instance, '_loaded_group_id', None)
+        if created:
+            counters.bump_author_posts(instance.author_id, 1)
+            counters.bump_group_posts(instance.group_id, 1)
+            timeline.fan_out(instance)
+        elif old_group_id != instance.group_id:
+            counters.bump_group_posts(old_group_id, -1)
+            counters.bump_group_posts(instance.group_id, 1)
+    cache.bump_post_feeds(instance, old_group_id)
+    if search.enabled():
+        search.index_post(instance)
+    image = instance.image.name or None
+    if (instance.thumbnail_pending
+            and image != (getattr(instance, '_loaded_image', None) or None)):
+        # Задача пишется в той же транзакции, что и пост.
+        tasks.make_post_thumbnail.delay(instance.pk)
+    instance._loaded_group_id = instance.group_id
+    instance._loaded_image = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    old_group_id = getattr(instance, '_loaded_group_id', instance.group_id)
+    with transaction.atomic():
+        counters.bump_author_posts(instance.author_id, -1)
+        counters.bump_group_posts(old_group_id, -1)
+    cache.bump_post_feeds(instance, old_group_id)
+    if search.enabled():
+        search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_post_comments(instance.post_id, 1)
+    cache.bump_post_feeds(instance.post)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post_comments(instance.post_id, -1)
+    # При каскадном удалении поста ленты уже сброшены его сигналом,
+    # а загружать пост ради каждого комментария слишком дорого.
+    if Comment.post.is_cached(instance):
+        cache.bump_post_feeds(instance.post)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        cache.bump_feeds(cache.ALL_FEEDS)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    cache.bump_feeds(cache.ALL_FEEDS)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    # Вход в систему сохраняет только last_login, карточки от него не
+    # зависят.
+    if created or raw or update_fields == frozenset({'last_login'}):
+        return
+    group_ids = (instance.posts.exclude(group=None).order_by()
+                 .values_list('group_id', flat=True).distinct())
+    commenter = ((cache.COMMENTERS,)
+                 if instance.comments.exists() else ())
+    cache.bump_feeds(cache.INDEX_FEED,
+                     cache.author_feed(instance.pk),
+                     cache.user_version(instance.pk),
+                     *commenter,
+                     *(cache.group_feed(group_id) for group_id in group_ids))
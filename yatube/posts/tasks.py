@@ -0,0 +1,12 @@
+from core.tasks import task
+from .models import Post
+from .thumbnails import make_thumbnail
+
+
+@task(priority=10)
+def make_post_thumbnail(post_id):
+    """Нарезает миниатюру новой картинки поста."""
+    post = (Post.objects.filter(pk=post_id, thumbnail_pending=True)
+            .only('id', 'image', 'author_id', 'group_id').first())
+    if post is not None:
+        make_thumbnail(post)
@@ -0,0 +1,41 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts.cache import card_cache_keys, replica_read
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+CARD_VARIANTS = {
+    'index': {'show_group': True, 'show_author_link': True},
+    'group': {'show_group': False, 'show_author_link': True},
+    'profile': {'show_group': True, 'show_author_link': False},
+}
+
+
+def render_cards(posts, variant, using='django'):
+    """Возвращает HTML карточек постов, дорисовывая только промахи кэша.
+
+    using — движок шаблонов; у каждого движка свои ключи карточек.
+    """
+    posts = list(posts)
+    keys = card_cache_keys(posts, f'{using}:{variant}')
+    cards = cache.get_many(keys)
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            missing[key] = render_to_string(
+                CARD_TEMPLATE, {'post': post, **CARD_VARIANTS[variant]},
+                using=using)
+    if missing and not replica_read():
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+    cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
+
+
+@register.simple_tag
+def post_cards(posts, variant):
+    return render_cards(posts, variant)
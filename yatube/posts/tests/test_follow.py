@@ -0,0 +1,94 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+
+class FollowTimelineTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='writer')
+        self.stranger = User.objects.create_user(username='stranger')
+        self.old_post = Post.objects.create(author=self.author, text='old')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def follow(self, author):
+        return self.client.post(reverse(
+            'posts:profile_follow', kwargs={'username': author.username}))
+
+    def feed_posts(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return [entry.post for entry in response.context['page_obj']]
+
+    def test_follow_backfills_and_unfollow_cleans_timeline(self):
+        """Тест заполнения ленты при подписке и очистки при отписке"""
+        response = self.follow(self.author)
+        self.assertRedirects(response, reverse(
+            'posts:profile', kwargs={'username': self.author.username}))
+        self.assertEqual(self.feed_posts(), [self.old_post])
+
+        self.client.post(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}))
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_new_post_fans_out_to_followers_only(self):
+        """Тест раскладки нового поста только по лентам подписчиков"""
+        self.follow(self.author)
+        post = Post.objects.create(author=self.author, text='new')
+        Post.objects.create(author=self.stranger, text='unrelated')
+        self.assertEqual(self.feed_posts(), [post, self.old_post])
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.stranger).exists())
+
+    @override_settings(TIMELINE_BATCH_SIZE=2)
+    def test_fan_out_in_batches(self):
+        """Тест раскладки поста по многим подписчикам пачками"""
+        followers = [User.objects.create_user(username=f'fan-{i}')
+                     for i in range(5)]
+        for follower in followers:
+            Follow.objects.create(user=follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='new')
+        self.assertEqual(
+            TimelineEntry.objects.filter(post=post).count(), len(followers))
+
+    def test_cannot_follow_self_or_twice(self):
+        """Тест запрета подписки на себя и повторной подписки"""
+        self.follow(self.reader)
+        self.follow(self.author)
+        self.follow(self.author)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(TimelineEntry.objects.count(), 1)
+        response = self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author.username}))
+        self.assertEqual(response.status_code, 405)
+
+    def test_profile_shows_follow_state(self):
+        """Тест кнопки подписки в профиле"""
+        url = reverse('posts:profile',
+                      kwargs={'username': self.author.username})
+        self.assertFalse(self.client.get(url).context['following'])
+        self.follow(self.author)
+        self.assertTrue(self.client.get(url).context['following'])
+
+    def test_rebuild_timelines(self):
+        """Тест пересборки лент подписок"""
+        self.follow(self.author)
+        TimelineEntry.objects.all().delete()
+        timeline.rebuild_timelines()
+        self.assertEqual(self.feed_posts(), [self.old_post])
+
+    def test_follow_index_reads_timeline_only(self):
+        """Тест чтения ленты подписок без соединения с подписками"""
+        self.follow(self.author)
+        # Сессия и пользователь берутся из кэша, остаётся сама лента.
+        with self.assertNumQueries(1) as queries:
+            self.feed_posts()
+        self.assertNotIn('posts_follow', ' '.join(
+            query['sql'] for query in queries.captured_queries))
@@ -0,0 +1,118 @@
+import html
+import json
+import re
+import shutil
+import tempfile
+import unittest
+from importlib.util import find_spec
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+CSRF_VALUE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*')
+
+
+def normalize(content):
+    """Разметка без различий в пробелах, экранировании и CSRF-токене."""
+    text = html.unescape(content.decode())
+    text = CSRF_VALUE.sub(r'\1', text)
+    text = re.sub(r'\s+', ' ', text)
+    return re.sub(r'\s*([<>"])\s*', r'\1', text).strip()
+
+
+@unittest.skipUnless(find_spec('jinja2'), 'Jinja2 не установлен')
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class Jinja2ParityTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='writer', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Классика', slug='classics', description='<b>Книги</b>')
+        for number in range(12):
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост «{number}» & "кавычки"')
+        cls.post = Post.objects.create(
+            author=cls.author, text='С картинкой <script>',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF,
+                                     content_type='image/gif'))
+        Post.objects.filter(pk=cls.post.pk).update(thumbnail_pending=False)
+        for number in range(25):
+            Comment.objects.create(post=cls.post, author=cls.author,
+                                   text=f'Комментарий {number}')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def render(self, url, engine):
+        templates = settings.TEMPLATES
+        if engine == 'jinja2':
+            templates = [settings.JINJA2_TEMPLATES, *templates]
+        with override_settings(TEMPLATES=templates):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return normalize(response.content)
+
+    def test_hot_pages_render_the_same(self):
+        """Тест одинаковой разметки горячих страниц в Django и Jinja2"""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                django_html = self.render(url, 'django')
+                jinja2_html = self.render(url, 'jinja2')
+                self.assertEqual(jinja2_html, django_html)
+
+    def test_jinja2_templates_are_used(self):
+        """Тест выбора шаблонов Jinja2, когда движок включён"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.assertIn('cache/', self.render(url, 'jinja2'))
+        with override_settings(
+                TEMPLATES=[settings.JINJA2_TEMPLATES, *settings.TEMPLATES]):
+            response = self.client.get(url)
+        self.assertTemplateNotUsed(response, 'posts/post_detail.html')
+
+    def test_bench_templates_reports_both_engines(self):
+        """Тест замера отрисовки страниц обоими движками"""
+        out = StringIO()
+        call_command('bench_templates', iterations=2, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report), {
+            'posts/index.html', 'posts/group_list.html',
+            'posts/profile.html', 'posts/post_detail.html'})
+        for results in report.values():
+            self.assertGreater(results['django']['mean_ms'], 0)
+            self.assertGreater(results['jinja2']['mean_ms'], 0)
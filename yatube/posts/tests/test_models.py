@@ -1,6 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
-from posts.models import Group, Post
+from posts.counters import author_posts_count, rebuild_counters
+from posts.models import AuthorCounter, Comment, Group, Post
 
 
 class PostModelTest(TestCase):
@@ -34,3 +38,58 @@ class PostModelTest(TestCase):
                          'Введите текст поста')
         self.assertEqual(self.post._meta.get_field('group').help_text,
                          'Выберите группу')
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='counter')
+        self.group = Group.objects.create(title='first', slug='first')
+        self.other_group = Group.objects.create(title='second',
+                                                slug='second')
+        self.post = Post.objects.create(author=self.user, text='text',
+                                        group=self.group)
+
+    def assertCounters(self, author_posts, group_posts, other_group_posts):
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(author_posts_count(self.user), author_posts)
+        self.assertEqual(self.group.posts_count, group_posts)
+        self.assertEqual(self.other_group.posts_count, other_group_posts)
+
+    def test_counters_follow_post_create_move_and_delete(self):
+        """Проверяем счётчики постов при создании, переносе и удалении"""
+        self.assertCounters(1, 1, 0)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(1, 0, 1)
+        post.delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_comment_counter(self):
+        """Проверяем счётчик комментариев поста"""
+        comment = Comment.objects.create(post=self.post, author=self.user,
+                                         text='comment')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_rebuild_counters_command(self):
+        """Проверяем пересчёт счётчиков командой"""
+        Group.objects.update(posts_count=0)
+        AuthorCounter.objects.all().delete()
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertCounters(1, 1, 0)
+
+    def test_rebuild_counters_many_authors(self):
+        """Проверяем пересчёт, когда авторов больше лимита SQLite"""
+        User.objects.bulk_create(
+            User(username=f'author{number}') for number in range(600))
+        Post.objects.bulk_create(
+            Post(author=author, text='text')
+            for author in User.objects.filter(username__startswith='author'))
+        rebuild_counters()
+        self.assertEqual(AuthorCounter.objects.count(), 601)
+        self.assertCounters(1, 1, 0)
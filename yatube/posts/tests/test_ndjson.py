@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.counters import author_posts_count
+from posts.models import Comment, Group, Post
+
+
+class NdjsonTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer',
+                                             password='secret')
+        self.group = Group.objects.create(title='group', slug='group')
+        self.post = Post.objects.create(author=self.user, group=self.group,
+                                        text='Экспортируемый пост')
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='comment')
+        self.path = tempfile.mkstemp(suffix='.ndjson')[1]
+        self.addCleanup(os.remove, self.path)
+
+    def export(self):
+        call_command('export_ndjson', self.path, stderr=StringIO())
+        with open(self.path, encoding='utf-8') as stream:
+            return [json.loads(line) for line in stream]
+
+    def test_export_writes_one_record_per_line(self):
+        """Проверяем выгрузку записей в порядке зависимостей"""
+        records = self.export()
+        self.assertEqual([record['model'] for record in records],
+                         ['user', 'group', 'post', 'comment'])
+        self.assertEqual(records[2]['text'], 'Экспортируемый пост')
+
+    def test_import_restores_data_and_dates(self):
+        """Проверяем загрузку в пустую базу с сохранением дат"""
+        pub_date = self.post.pub_date
+        self.export()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        call_command('import_ndjson', self.path, stderr=StringIO())
+        post = Post.objects.get()
+        self.assertEqual(post.text, 'Экспортируемый пост')
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertEqual(post.group.slug, 'group')
+        self.assertTrue(post.author.check_password('secret'))
+        self.assertEqual(post.comments.get().text, 'comment')
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(author_posts_count(post.author), 1)
+
+    def test_import_next_to_existing_data(self):
+        """Проверяем загрузку поверх существующих записей"""
+        self.export()
+        call_command('import_ndjson', self.path, stderr=StringIO())
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Post.objects.count(), 2)
+        imported = Post.objects.exclude(pk=self.post.pk).get()
+        self.assertEqual(imported.comments.count(), 1)
+        self.assertEqual(author_posts_count(self.user), 2)
@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Group, Post
+
+
+class PostsQueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = [
+            User.objects.create_user(username=f'user-{i}',
+                                     first_name=f'Имя-{i}')
+            for i in range(12)
+        ]
+        cls.groups = [
+            Group.objects.create(title=f'group-{i}', slug=f'group-{i}')
+            for i in range(4)
+        ]
+        cls.author = cls.users[0]
+        cls.group = cls.groups[0]
+        for i in range(30):
+            Post.objects.create(text=f'post-{i}',
+                                author=cls.users[i % 3 and i % 12],
+                                group=cls.groups[i % 4])
+        cls.post = Post.objects.filter(author=cls.author).first()
+        for user in cls.users:
+            Comment.objects.create(post=cls.post, author=user, text='comment')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def budgets(self):
+        """Бюджеты запросов страниц при пустом кэше."""
+        return {
+            reverse('posts:index'): 1,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}): 3,
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): 4,
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}): 5,
+        }
+
+    def test_guest_pages_fit_query_budget(self):
+        """Тест числа запросов страниц для гостя"""
+        for url, budget in self.budgets().items():
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, budget, self.guest_client)
+
+    def test_authorized_pages_fit_query_budget(self):
+        """Тест числа запросов страниц для авторизованного пользователя"""
+        # Сессия и пользователь добавляют по запросу к каждой странице.
+        for url, budget in self.budgets().items():
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, budget + 2,
+                                       self.authorized_client)
+        self.assertQueryBudget(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            4, self.authorized_client)
+        self.assertQueryBudget(reverse('posts:post_create'), 3,
+                               self.authorized_client)
@@ -0,0 +1,98 @@
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import matching_ids, stem
+
+
+class StemTest(TestCase):
+    def test_word_forms_share_stem(self):
+        """Проверяем, что формы слова приводятся к одной основе"""
+        forms = {
+            'книга': ('книги', 'книгой', 'книгами'),
+            'вечерний': ('вечернего', 'вечерними'),
+            'ёлка': ('елки', 'ёлкой'),
+        }
+        for word, word_forms in forms.items():
+            for word_form in word_forms:
+                with self.subTest(word_form=word_form):
+                    self.assertEqual(stem(word_form), stem(word))
+
+
+class SearchViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='search',
+                                             is_staff=True,
+                                             is_superuser=True)
+        self.post = Post.objects.create(
+            author=self.user, text='Вечерние прогулки по набережной')
+        Post.objects.create(author=self.user, text='Утренний кофе')
+
+    def search(self, query, **params):
+        return self.client.get(reverse('posts:search'),
+                               {'q': query, **params})
+
+    def test_search_finds_word_forms(self):
+        """Тест поиска по другой форме слова"""
+        response = self.search('вечерняя прогулка')
+        self.assertEqual(response.context['posts'], [self.post])
+
+    def test_index_follows_edit_and_delete(self):
+        """Тест обновления индекса при правке и удалении поста"""
+        self.post.text = 'Ночные прогулки'
+        self.post.save()
+        self.assertEqual(self.search('вечерняя').context['posts'], [])
+        self.assertEqual(self.search('ночная').context['posts'],
+                         [self.post])
+        self.post.delete()
+        self.assertEqual(self.search('ночная').context['posts'], [])
+
+    def test_search_is_paginated_by_cursor(self):
+        """Тест постраничной выдачи поиска по курсору"""
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'прогулка номер {i}')
+            for i in range(12)
+        ])
+        call_command('rebuild_search_index', stdout=StringIO())
+        first_page = self.search('прогулки')
+        self.assertEqual(len(first_page.context['posts']), 10)
+        second_page = self.search(
+            'прогулки', after=first_page.context['next_cursor'])
+        self.assertEqual(len(second_page.context['posts']), 3)
+        self.assertIsNone(second_page.context['next_cursor'])
+        found = first_page.context['posts'] + second_page.context['posts']
+        self.assertEqual(len({post.pk for post in found}), 13)
+
+    def test_admin_search_uses_index(self):
+        """Тест поиска постов в админке по индексу"""
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'прогулке'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.post])
+
+
+class SearchMigrationTest(TestCase):
+    def test_migration_indexes_existing_posts(self):
+        """Проверяем, что миграция строит индекс по имеющимся постам"""
+        migration = import_module('posts.migrations.0011_post_search_index')
+        user = User.objects.create_user(username='migration')
+        post = Post.objects.create(author=user, text='Старые книги')
+        schema_editor = SimpleNamespace(connection=connection)
+        migration.drop_search_index(apps, schema_editor)
+        migration.create_search_index(apps, schema_editor)
+        self.assertEqual(
+            list(Post.objects.filter(pk__in=matching_ids('книга'))
+                 .values_list('pk', flat=True)),
+            [post.pk])
@@ -0,0 +1,85 @@
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts import search, seed
+from posts.models import Comment, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GeneratorTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_text_and_dates_are_reproducible(self):
+        """Тест одинакового текста и дат при одном seed"""
+        now = timezone.now()
+        first, second = random.Random(7), random.Random(7)
+        self.assertEqual(seed.russian_text(first), seed.russian_text(second))
+        date = seed.spread_date(first, now)
+        self.assertEqual(date, seed.spread_date(second, now))
+        self.assertTrue(now - timedelta(days=365) <= date <= now)
+
+    def test_chunk_does_not_depend_on_order(self):
+        """Тест пачки, зависящей только от seed и номера первой записи"""
+        seed.seed(users=3, groups=1, posts=0, comments=0)
+        options = {'seed': 1, 'now': datetime(2024, 1, 1), 'users': 3,
+                   'groups': 1, 'posts': 6, 'images': [],
+                   'image_share': 0, 'search': False,
+                   'offsets': {'user': 0, 'group': 0, 'post': 0}}
+
+        def write(start, stop):
+            seed.write_chunk(*seed.build_chunk(('post', start, stop,
+                                                options)))
+        write(4, 7)
+        write(1, 4)
+        texts = list(Post.objects.order_by('pk')
+                     .values_list('text', flat=True))
+        Post.objects.all().delete()
+        write(1, 4)
+        write(4, 7)
+        self.assertEqual(list(Post.objects.order_by('pk')
+                              .values_list('text', flat=True)), texts)
+
+    def test_images_wait_for_thumbnails(self):
+        """Тест постов с картинками в очереди миниатюр"""
+        seed.seed(users=2, groups=1, posts=5, comments=3, image_share=1)
+        self.assertEqual(
+            Post.objects.filter(thumbnail_pending=True).count(), 5)
+        self.assertTrue(Post.objects.first().image.storage.exists(
+            Post.objects.first().image.name))
+
+    def test_command_appends_to_filled_database(self):
+        """Тест генерации поверх существующих записей"""
+        admin = User.objects.create_superuser('admin', 'a@example.com', 'x')
+        for _ in range(2):
+            call_command('generate_data', users=2, groups=1, posts=3,
+                         comments=2, workers=1, stdout=StringIO(),
+                         stderr=StringIO())
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertEqual(Comment.objects.count(), 4)
+        # Авторы берутся только из новых пользователей.
+        self.assertFalse(Post.objects.filter(author=admin).exists())
+        self.assertFalse(Comment.objects.filter(author=admin).exists())
+        post = Post.objects.select_related('author').latest('pub_date')
+        self.assertTrue(timezone.is_aware(post.pub_date))
+        self.assertLessEqual(post.pub_date, timezone.now())
+        self.assertTrue(post.author.check_password(seed.PASSWORD))
+        if search.enabled():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT count(*) FROM {search.SEARCH_TABLE}')
+                self.assertEqual(cursor.fetchone()[0], 6)
@@ -0,0 +1,68 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.testing import OnCommitMixin
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTest(OnCommitMixin, TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = User.objects.create_user(username='painter')
+        self.post = Post.objects.create(
+            author=self.user, text='with image',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF,
+                                     content_type='image/gif'))
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """Тест заглушки до нарезки миниатюры и картинки после неё"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.assertTrue(self.post.thumbnail_pending)
+        self.assertContains(self.guest_client.get(url),
+                            'Картинка обрабатывается')
+        self.assertContains(self.guest_client.get(reverse('posts:index')),
+                            'Картинка обрабатывается')
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('backfill_thumbnails', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertFalse(self.post.thumbnail_pending)
+        for url in (url, reverse('posts:index')):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertNotContains(response, 'Картинка обрабатывается')
+                self.assertContains(response, '<img class="card-img')
+
+    def test_text_edit_keeps_thumbnail(self):
+        """Тест того, что правка текста не сбрасывает миниатюру"""
+        call_command('backfill_thumbnails', stdout=StringIO())
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'edited'
+        post.save()
+        post.refresh_from_db()
+        self.assertFalse(post.thumbnail_pending)
@@ -1,10 +1,17 @@
+from http import HTTPStatus
+
 from django.contrib.auth.models import User
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from datetime import datetime
 
+from core.testing import OnCommitMixin
+from posts.cache import INDEX_FEED, bump_feeds, feed_versions
 from posts.forms import PostForm
-from posts.models import Post, Group
+from posts.models import Comment, Post, Group
+from posts.utils import PAGE_FALLBACK_LIMIT, CursorPaginator
 
 
 class PostsViewsTest(TestCase):
@@ -146,3 +153,299 @@ class PaginatorViewsTest(TestCase):
             reverse('posts:profile',
                     kwargs={'username': self.user.username}) + '?page=2')
         self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.user = User.objects.create_user(username='test',
+                                            password='test')
+        Post.objects.bulk_create([
+            Post(text=f'test-{i}', author=cls.user)
+            for i in range(13)
+        ])
+
+    def test_after_cursor_returns_next_page(self):
+        """Тест перехода на следующую страницу по курсору"""
+        first_page = self.guest_client.get(
+            reverse('posts:index')).context['page_obj']
+        response = self.guest_client.get(
+            reverse('posts:index') + f'?after={first_page.next_cursor}')
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), list(Post.objects.all()[10:]))
+        self.assertFalse(page_obj.has_next())
+        self.assertTrue(page_obj.has_previous())
+
+    def test_before_cursor_returns_previous_page(self):
+        """Тест возврата на предыдущую страницу по курсору"""
+        second_page = self.guest_client.get(
+            reverse('posts:index') + '?page=2').context['page_obj']
+        response = self.guest_client.get(
+            reverse('posts:index')
+            + f'?before={second_page.previous_cursor}')
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), list(Post.objects.all()[:10]))
+        self.assertFalse(page_obj.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Тест испорченного курсора"""
+        response = self.guest_client.get(
+            reverse('posts:index') + '?after=broken')
+        self.assertEqual(list(response.context['page_obj']),
+                         list(Post.objects.all()[:10]))
+
+    def test_page_number_is_bounded(self):
+        """Тест ограничения глубины пагинации по номеру страницы"""
+        pages = CursorPaginator(Post.objects.all(), 2)
+        self.assertEqual(pages.fallback_limit, PAGE_FALLBACK_LIMIT)
+        pages.fallback_limit = 3
+        page_obj = pages.page_number(100000)
+        self.assertEqual(list(page_obj), list(Post.objects.all()[4:6]))
+        self.assertEqual(page_obj.number, 3)
+
+    def test_page_past_the_end_returns_last_page(self):
+        """Тест номера страницы за концом ленты"""
+        response = self.guest_client.get(reverse('posts:index') + '?page=5')
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(list(page_obj), list(Post.objects.all()[10:]))
+        self.assertNotContains(response, '?before=None')
+        self.assertNotContains(response, '?after=')
+
+
+class FeedCacheTest(OnCommitMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = User.objects.create_user(username='cached')
+        self.group = Group.objects.create(title='cached', slug='cached')
+        for i in range(11):
+            Post.objects.create(text=f'cached-{i}', author=self.user,
+                                group=self.group)
+
+    def test_pages_are_cached_separately(self):
+        """Тест того, что страницы ленты кэшируются по отдельности"""
+        first_page = self.guest_client.get(reverse('posts:index'))
+        second_page = self.guest_client.get(
+            reverse('posts:index') + '?page=2')
+        self.assertContains(first_page, 'cached-10')
+        self.assertNotContains(second_page, 'cached-10')
+        self.assertContains(second_page, 'cached-0')
+
+    def test_feeds_are_invalidated_on_write(self):
+        """Тест сброса кэша лент при изменении поста"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'cached'}),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        post = Post.objects.latest('id')
+        post.text = 'edited text'
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url),
+                                    'edited text')
+
+    def test_versions_change_after_commit(self):
+        """Тест смены версий лент только после фиксации транзакции"""
+        before = feed_versions(INDEX_FEED)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Post.objects.create(text='new', author=self.user)
+            self.assertEqual(feed_versions(INDEX_FEED), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(feed_versions(INDEX_FEED), before)
+
+    def test_rolled_back_write_keeps_versions(self):
+        """Тест того, что откат записи не меняет версии лент"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(DatabaseError):
+                with transaction.atomic():
+                    Post.objects.create(text='new', author=self.user)
+                    raise DatabaseError
+        self.assertEqual(callbacks, [])
+
+    def test_cached_page_skips_feed_query(self):
+        """Тест того, что закэшированная страница не выбирает посты"""
+        self.guest_client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            self.guest_client.get(reverse('posts:index'))
+
+
+class ConditionalGetTest(OnCommitMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = User.objects.create_user(username='conditional')
+        self.group = Group.objects.create(title='conditional',
+                                          slug='conditional')
+        self.post = Post.objects.create(text='conditional',
+                                        author=self.user, group=self.group)
+
+    def test_feeds_answer_not_modified(self):
+        """Тест ответа 304 лент по ETag и его смены при записи"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'conditional'}),
+        )
+        etags = {}
+        for url in urls:
+            etags[url] = self.guest_client.get(url)['ETag']
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(text='new', author=self.user,
+                                group=self.group)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_detail_validators_follow_comments(self):
+        """Тест валидаторов страницы поста при новом комментарии"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        response = self.guest_client.get(url)
+        self.assertEqual(
+            self.guest_client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+            HTTPStatus.NOT_MODIFIED)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, author=self.user,
+                                   text='comment')
+        self.assertEqual(
+            self.guest_client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+            HTTPStatus.OK)
+
+    def test_post_detail_validators_follow_user_edits(self):
+        """Тест смены ETag поста при правке автора и комментатора"""
+        commenter = User.objects.create_user(username='commenter')
+        Comment.objects.create(post=self.post, author=commenter,
+                               text='comment')
+        urls = (
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            reverse('api:post_detail', kwargs={'post_id': self.post.id}),
+        )
+        for user in (self.user, commenter):
+            etags = {url: self.guest_client.get(url)['ETag'] for url in urls}
+            user.first_name = 'Новое'
+            with self.captureOnCommitCallbacks(execute=True):
+                user.save()
+            for url in urls:
+                with self.subTest(user=user.username, url=url):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etags[url])
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_detail_ignores_if_modified_since(self):
+        """Тест того, что страница поста не отвечает 304 по дате"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        response = self.guest_client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='comment')
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'comment')
+
+    @override_settings(FEED_VERSIONS_SHARED=False)
+    def test_no_etags_without_shared_versions(self):
+        """Тест отказа от ETag, когда версии лент не общие"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'conditional'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH='*')
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertFalse(response.has_header('ETag'))
+
+
+class PostCardCacheTest(OnCommitMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = User.objects.create_user(username='card')
+        self.group = Group.objects.create(title='card', slug='card')
+        self.post = Post.objects.create(text='card text', author=self.user,
+                                        group=self.group)
+
+    def test_cards_are_shared_between_feeds(self):
+        """Тест того, что карточка рендерится один раз на вариант ленты"""
+        with self.assertTemplateUsed('posts/includes/post_card.html'):
+            self.guest_client.get(reverse('posts:index'))
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_feeds(INDEX_FEED)
+        with self.assertTemplateNotUsed('posts/includes/post_card.html'):
+            self.assertContains(
+                self.guest_client.get(reverse('posts:index')), 'card text')
+
+    def test_card_is_invalidated_on_author_change(self):
+        """Тест сброса карточки при изменении автора"""
+        self.guest_client.get(reverse('posts:index'))
+        self.user.first_name = 'Новое'
+        self.user.last_name = 'Имя'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertContains(self.guest_client.get(reverse('posts:index')),
+                            'Новое Имя')
+
+    def test_card_is_invalidated_on_group_rename(self):
+        """Тест сброса карточки при переименовании группы"""
+        self.guest_client.get(reverse('posts:index'))
+        self.group.title = 'renamed group'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.save()
+        self.assertContains(self.guest_client.get(reverse('posts:index')),
+                            'renamed group')
+
+
+class CommentsPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.user = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(text='discussed', author=cls.user)
+        for i in range(25):
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text=f'comment-{i}')
+
+    def test_post_detail_shows_newest_comments(self):
+        """Тест вывода последних комментариев на странице поста"""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        comments = response.context['comments']
+        self.assertEqual(list(comments),
+                         list(self.post.comments.all()[:20]))
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'js-more-comments')
+
+    def test_comments_fragment_returns_next_batch(self):
+        """Тест подгрузки следующих комментариев фрагментом"""
+        first_batch = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        ).context['comments']
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+            + f'?after={first_batch.next_cursor}')
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertEqual(list(response.context['comments']),
+                         list(self.post.comments.all()[20:]))
+        self.assertNotContains(response, 'js-more-comments')
@@ -0,0 +1,49 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+Пост с новой картинкой помечается thumbnail_pending, шаблоны показывают
+заглушку, пока фоновая задача make_post_thumbnail не нарежет миниатюру и
+не снимет пометку. Посты, помеченные в обход сигналов, например при
+импорте, добирает thumbnail_worker. Размер и параметры должны совпадать
+с posts/includes/post_image.html в обоих движках шаблонов, иначе шаблон
+не попадёт в готовую миниатюру.
+"""
+import logging
+
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from . import cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def pending_posts(batch_size):
+    return list(Post.objects.filter(thumbnail_pending=True)
+                .only('id', 'image', 'author_id', 'group_id')
+                .order_by('id')[:batch_size])
+
+
+def make_thumbnail(post):
+    """Нарезает миниатюру и открывает её шаблонам."""
+    try:
+        get_thumbnail(post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+    except Exception:
+        # Битая картинка не должна вечно стоять в очереди: sorl покажет
+        # пустое место, как и раньше при ошибке в шаблоне.
+        logger.exception('Не удалось нарезать миниатюру поста %s', post.pk)
+    # Отметка изменения сбрасывает кэш карточки с заглушкой.
+    Post.objects.filter(pk=post.pk, image=post.image.name).update(
+        thumbnail_pending=False, updated=timezone.now())
+    cache.bump_post_feeds(post)
+
+
+def process_pending(batch_size=100):
+    """Обрабатывает очередную пачку постов и возвращает их число."""
+    posts = pending_posts(batch_size)
+    for post in posts:
+        make_thumbnail(post)
+    return len(posts)
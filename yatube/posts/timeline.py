@@ -0,0 +1,64 @@
+"""Лента подписок, материализованная при записи.
+
+Новый пост раскладывается пачками в таблицу TimelineEntry каждому
+подписчику автора, поэтому чтение ленты — один проход по индексу
+(user, -pub_date, -id) без соединения с подписками.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .models import Follow, Post, TimelineEntry
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(entries):
+    # Запись уже могла попасть в ленту, например при повторной подписке.
+    # Размер пачки INSERT Django подбирает под лимиты базы сам.
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out(post, batch_size=None):
+    """Добавляет пост в ленты всех подписчиков его автора."""
+    batch_size = batch_size or settings.TIMELINE_BATCH_SIZE
+    followers = (Follow.objects.filter(author_id=post.author_id)
+                 .values_list('user_id', flat=True).iterator())
+    for user_ids in _batches(followers, batch_size):
+        _insert([TimelineEntry(user_id=user_id, post_id=post.pk,
+                               author_id=post.author_id,
+                               pub_date=post.pub_date)
+                 for user_id in user_ids])
+
+
+def backfill(user_id, author_id, limit=None):
+    """Переносит в ленту читателя последние посты нового автора."""
+    limit = limit or settings.TIMELINE_BACKFILL_LIMIT
+    posts = (Post.objects.filter(author_id=author_id)
+             .values_list('pk', 'pub_date')[:limit])
+    _insert([TimelineEntry(user_id=user_id, post_id=post_id,
+                           author_id=author_id, pub_date=pub_date)
+             for post_id, pub_date in posts])
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты читателя посты автора, от которого он отписался."""
+    TimelineEntry.objects.filter(user_id=user_id,
+                                 author_id=author_id).delete()
+
+
+@transaction.atomic
+def rebuild_timelines():
+    """Собирает все ленты заново, например после массовой загрузки."""
+    TimelineEntry.objects.all().delete()
+    follows = Follow.objects.values_list('user_id', 'author_id').iterator()
+    for user_id, author_id in follows:
+        backfill(user_id, author_id)
@@ -11,10 +11,20 @@ urlpatterns = [
          name='profile'),
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('posts/<int:post_id>/edit/', views.post_edit,
          name='post_edit'),
     path('posts/<int:post_id>/', views.post_detail,
          name='post_detail'),
     path('create/', views.post_create,
          name='post_create'),
+    path('search/', views.search_posts,
+         name='search'),
+    path('follow/', views.follow_index,
+         name='follow_index'),
+    path('profile/<str:username>/follow/', views.profile_follow,
+         name='profile_follow'),
+    path('profile/<str:username>/unfollow/', views.profile_unfollow,
+         name='profile_unfollow'),
 ]
@@ -1,6 +1,172 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
 
+from django.core.paginator import Page, Paginator, InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
-def paginator(request, objects, count_on_page=10):
-    page_number = request.GET.get('page')
-    return Paginator(objects, count_on_page).get_page(page_number)
+# Глубже этой страницы ?page=N не обслуживается через OFFSET:
+# старые ссылки продолжают работать, но не сканируют всю таблицу.
+PAGE_FALLBACK_LIMIT = 50
+
+
+def encode_cursor(obj, field='pub_date'):
+    """Кодирует позицию объекта или строки values() (дата, id) в курсор."""
+    if isinstance(obj, dict):
+        value, pk = obj[field], obj['id']
+    else:
+        value, pk = getattr(obj, field), obj.pk
+    raw = f'{value.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (дата, id) из курсора или None, если он испорчен."""
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+        pub_date, pk = raw.rsplit('|', 1)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class CursorPage(Page):
+    """Страница ленты, которая знает соседей без COUNT(*).
+
+    Строки выбираются при первом обращении, поэтому страница, чей HTML
+    уже лежит в кэше фрагментов, не делает запросов к базе.
+    """
+
+    def __init__(self, loader, number, paginator, key):
+        self._loader = loader
+        self._rows = None
+        self.number = number
+        self.paginator = paginator
+        self.key = key
+
+    def _load(self):
+        if self._rows is None:
+            self._rows, self._has_next, self._has_previous = self._loader()
+        return self._rows
+
+    @property
+    def object_list(self):
+        return self._load()
+
+    def has_next(self):
+        self._load()
+        return self._has_next
+
+    def has_previous(self):
+        self._load()
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self.has_next() and self.object_list:
+            return encode_cursor(self.object_list[-1], self.paginator.field)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous() and self.object_list:
+            return encode_cursor(self.object_list[0], self.paginator.field)
+        return None
+
+    def next_page_number(self):
+        if self.number is None:
+            raise InvalidPage('У страницы по курсору нет номера')
+        return super().next_page_number()
+
+    def previous_page_number(self):
+        if self.number is None:
+            raise InvalidPage('У страницы по курсору нет номера')
+        return super().previous_page_number()
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор ленты, который ищет по (дата, id), по умолчанию pub_date.
+
+    Страницы по курсорам ?after= и ?before= выбираются по составному
+    индексу без OFFSET, номера ?page=N до PAGE_FALLBACK_LIMIT обслуживаются
+    через OFFSET для совместимости со старыми ссылками.
+    """
+
+    def __init__(self, object_list, per_page,
+                 fallback_limit=PAGE_FALLBACK_LIMIT, count=None,
+                 field='pub_date'):
+        self.field = field
+        self.ordering = (f'-{field}', '-id')
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+        self.fallback_limit = fallback_limit
+        if count is not None:
+            # Готовое значение из счётчика вместо COUNT(*).
+            self.__dict__['count'] = count
+
+    def _slice(self, queryset):
+        rows = list(queryset[:self.per_page + 1])
+        return rows[:self.per_page], len(rows) > self.per_page
+
+    def page_after(self, cursor):
+        value, pk = cursor
+
+        def load():
+            queryset = self.object_list.filter(
+                Q(**{f'{self.field}__lt': value})
+                | Q(**{self.field: value, 'pk__lt': pk}))
+            rows, has_next = self._slice(queryset)
+            return rows, has_next, True
+        key = f'after:{value.isoformat()}|{pk}'
+        return CursorPage(load, None, self, key)
+
+    def page_before(self, cursor):
+        value, pk = cursor
+
+        def load():
+            queryset = self.object_list.filter(
+                Q(**{f'{self.field}__gt': value})
+                | Q(**{self.field: value, 'pk__gt': pk})
+            ).order_by(self.field, 'id')
+            rows, has_previous = self._slice(queryset)
+            rows.reverse()
+            return rows, True, has_previous
+        key = f'before:{value.isoformat()}|{pk}'
+        return CursorPage(load, None, self, key)
+
+    def page_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        number = min(max(number, 1), self.fallback_limit)
+
+        def load():
+            rows, has_next = self._slice(self._from_page(number))
+            if not rows and number > 1:
+                # Как get_page: номер за концом ленты даёт последнюю
+                # страницу. COUNT(*) нужен только в этом случае.
+                page.number = self.num_pages
+                rows, has_next = self._slice(self._from_page(page.number))
+            return rows, has_next, page.number > 1
+        page = CursorPage(load, number, self, f'page:{number}')
+        return page
+
+    def _from_page(self, number):
+        return self.object_list[(number - 1) * self.per_page:]
+
+
+def paginator(request, objects, count_on_page=10, count=None,
+              field='pub_date'):
+    pages = CursorPaginator(objects, count_on_page, count=count,
+                            field=field)
+    for param, get_page in (('after', pages.page_after),
+                            ('before', pages.page_before)):
+        cursor = decode_cursor(request.GET.get(param, ''))
+        if cursor is not None:
+            return get_page(cursor)
+    return pages.page_number(request.GET.get('page'))
@@ -1,51 +1,159 @@
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, redirect
+from django.views.decorators.http import condition, require_POST
 
-from .models import Post, Group, Comment
+from core.ratelimit import ratelimit
+from core.sqlite import serialized_write
+
+from .models import Post, Group, Follow
 from .forms import PostForm, CommentForm
+from .cache import (COMMENTERS, INDEX_FEED, author_feed, etags_enabled,
+                    feed_cache_context, feed_etag, feed_versions, group_feed,
+                    make_etag, user_version)
+from .counters import author_posts_count
 from .utils import paginator
+from . import querysets, search
+
+
+def index_etag(request, count_of_posts=10):
+    return feed_etag(request, INDEX_FEED)
+
+
+def group_posts_etag(request, slug, count_of_posts=10):
+    group_id = (Group.objects.filter(slug=slug)
+                .values_list('pk', flat=True).first())
+    if group_id is None:
+        return None
+    return feed_etag(request, group_feed(group_id))
+
 
+def is_following(request, author_id):
+    """Подписан ли читатель на автора; запоминается в запросе."""
+    if not request.user.is_authenticated or request.user.pk == author_id:
+        return False
+    if getattr(request, 'following', None) is None:
+        request.following = Follow.objects.filter(
+            user=request.user, author_id=author_id).exists()
+    return request.following
 
+
+def profile_etag(request, username, count_of_posts=10):
+    author_id = (User.objects.filter(username=username)
+                 .values_list('pk', flat=True).first())
+    if author_id is None:
+        return None
+    etag = feed_etag(request, author_feed(author_id))
+    if etag is None:
+        return None
+    return make_etag(etag, is_following(request, author_id))
+
+
+def post_detail_etag(request, post_id, size_of_title=30):
+    # Last-Modified странице не подходит: она зависит ещё от
+    # комментариев, автора, версий лент и читателя, а их учитывает ETag.
+    if not etags_enabled():
+        return None
+    state = (Post.objects.filter(pk=post_id)
+             .values_list('updated', 'comments_count', 'author_id').first())
+    if state is None:
+        return None
+    updated, comments_count, author_id = state
+    return make_etag(updated.isoformat(), comments_count,
+                     author_posts_count(author_id),
+                     *feed_versions(user_version(author_id), COMMENTERS),
+                     request.GET.urlencode(), request.user.pk)
+
+
+@condition(etag_func=index_etag)
 def index(request, count_of_posts=10):
-    posts = Post.objects.select_related('author', 'group').all()
+    posts = querysets.index_posts()
     page_obj = paginator(request, posts, count_of_posts)
     template = 'posts/index.html'
     context = {'page_obj': page_obj,
+               **feed_cache_context(page_obj, INDEX_FEED),
                }
     return render(request, template, context)
 
 
+@condition(etag_func=group_posts_etag)
 def group_posts(request, slug, count_of_posts=10):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = paginator(request, posts, count_of_posts)
+    posts = querysets.group_posts(group)
+    page_obj = paginator(request, posts, count_of_posts,
+                         count=group.posts_count)
     template = 'posts/group_list.html'
     context = {'group': group,
                'page_obj': page_obj,
+               **feed_cache_context(page_obj, group_feed(group.pk)),
                }
     return render(request, template, context)
 
 
+@condition(etag_func=profile_etag)
 def profile(request, username, count_of_posts=10):
     author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = paginator(request, posts, count_of_posts)
+    posts = querysets.author_posts(author)
+    posts_count = author_posts_count(author)
+    page_obj = paginator(request, posts, count_of_posts, count=posts_count)
     template = 'posts/profile.html'
     context = {
         'author': author,
-        'posts': posts,
+        'posts_count': posts_count,
+        'following': is_following(request, author.pk),
         'page_obj': page_obj,
+        **feed_cache_context(page_obj, author_feed(author.pk)),
     }
     return render(request, template, context)
 
 
-def post_detail(request, post_id, size_of_title=30):
-    post = get_object_or_404(Post, pk=post_id)
+@login_required
+def follow_index(request, count_of_posts=10):
+    entries = querysets.following_entries(request.user)
+    page_obj = paginator(request, entries, count_of_posts)
+    template = 'posts/follow.html'
+    context = {
+        'page_obj': page_obj,
+        # Генератор: посты достаются из страницы только при отрисовке.
+        'posts': (entry.post for entry in page_obj),
+    }
+    return render(request, template, context)
+
+
+@require_POST
+@login_required
+@serialized_write
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username=username)
+
+
+@require_POST
+@login_required
+@serialized_write
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    # delete() у набора записей присылает post_delete, и лента чистится.
+    Follow.objects.filter(user=request.user, author=author).delete()
+    return redirect('posts:profile', username=username)
+
+
+def comments_page(request, post, count_of_comments):
+    comments = querysets.post_comments(post)
+    return paginator(request, comments, count_of_comments,
+                     count=post.comments_count, field='created')
+
+
+@condition(etag_func=post_detail_etag)
+def post_detail(request, post_id, size_of_title=30, count_of_comments=20):
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
     title = post.text[:size_of_title]
-    count_of_posts = post.author.posts.count()
+    count_of_posts = author_posts_count(post.author)
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post=post)
+    comments = comments_page(request, post, count_of_comments)
     template = 'posts/post_detail.html'
     context = {
         'form': form,
@@ -57,7 +165,39 @@ def post_detail(request, post_id, size_of_title=30):
     return render(request, template, context)
 
 
+@condition(etag_func=post_detail_etag)
+def post_comments(request, post_id, count_of_comments=20):
+    post = get_object_or_404(Post, pk=post_id)
+    template = 'posts/includes/comments.html'
+    context = {
+        'post': post,
+        'comments': comments_page(request, post, count_of_comments),
+    }
+    return render(request, template, context)
+
+
+def search_posts(request, count_of_posts=10):
+    query = request.GET.get('q', '').strip()
+    posts, next_cursor = [], None
+    if query and search.enabled():
+        posts, next_cursor = search.search_posts(
+            Post.objects.select_related('author', 'group'), query,
+            search.decode_cursor(request.GET.get('after', '')),
+            count_of_posts)
+    template = 'posts/search.html'
+    context = {
+        'query': query,
+        'posts': posts,
+        'next_cursor': next_cursor,
+    }
+    return render(request, template, context)
+
+
 @login_required
+@ratelimit('user', '5/m')
+@ratelimit('user', '50/d')
+@ratelimit('ip', '20/m')
+@serialized_write
 def post_create(request):
     form = PostForm(request.POST or None)
     if request.method == 'POST' and form.is_valid():
@@ -74,9 +214,11 @@ def post_create(request):
 
 
 @login_required
+@ratelimit('user', '20/m')
+@serialized_write
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    if request.user != post.author:
+    if request.user.pk != post.author_id:
         return redirect('posts:post_detail', post_id=post_id)
     form = PostForm(
         request.POST or None,
@@ -96,6 +238,9 @@ def post_edit(request, post_id):
 
 
 @login_required
+@ratelimit('user', '10/m')
+@ratelimit('ip', '30/m')
+@serialized_write
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
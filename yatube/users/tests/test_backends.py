@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import OnCommitMixin
+from users import backends
+from users.backends import CachedModelBackend, user_cache_key
+
+SHARED_CACHE_TABLE = 'users_test_shared_cache'
+
+
+class CachedUserTest(OnCommitMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader',
+                                             password='old-password')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:follow_index')
+
+    def auth_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries
+                if 'FROM "auth_user"' in query['sql']
+                or 'FROM "django_session"' in query['sql']]
+
+    def test_user_and_session_come_from_cache(self):
+        """Тест чтения пользователя и сессии из кэша"""
+        self.auth_queries()
+        self.assertEqual(self.auth_queries(), [])
+
+    def test_password_change_drops_other_sessions(self):
+        """Тест выхода старых сессий сразу после смены пароля"""
+        self.auth_queries()
+        self.user.set_password('new-password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        response = self.client.get(self.url)
+        self.assertRedirects(
+            response, f'{reverse("users:login")}?next={self.url}')
+
+    def test_edit_and_logout_forget_user(self):
+        """Тест сброса кэша пользователя при правке и выходе"""
+        key = user_cache_key(self.user.pk)
+        self.auth_queries()
+        self.assertIsNotNone(cache.get(key))
+        self.user.first_name = 'Иван'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save()
+            self.assertIsNone(cache.get(key))
+            # Запрос до коммита снова кладёт пользователя в кэш.
+            self.client.get(self.url)
+            self.assertIsNotNone(cache.get(key))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(key))
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['user'].first_name, 'Иван')
+        self.client.get(reverse('users:logout'))
+        self.assertIsNone(cache.get(key))
+
+
+class SharedCacheTest(OnCommitMixin, TestCase):
+    """Два экземпляра кэша вместо двух процессов с общим хранилищем."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='shared',
+                                             password='old-password')
+        self.backend = CachedModelBackend()
+
+    def password_seen_after_change(self, first_worker, second_worker):
+        with mock.patch.object(backends, 'cache', second_worker):
+            self.backend.get_user(self.user.pk)
+        self.user.set_password('new-password')
+        with mock.patch.object(backends, 'cache', first_worker):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.save()
+        with mock.patch.object(backends, 'cache', second_worker):
+            return self.backend.get_user(self.user.pk).password
+
+    def test_shared_cache_drops_user_in_every_worker(self):
+        """Тест сброса пользователя во всех процессах с общим кэшем"""
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                'LOCATION': SHARED_CACHE_TABLE}}):
+            call_command('createcachetable', verbosity=0)
+        workers = [DatabaseCache(SHARED_CACHE_TABLE, {}) for _ in range(2)]
+        self.assertEqual(self.password_seen_after_change(*workers),
+                         self.user.password)
+
+    def test_local_caches_miss_other_workers(self):
+        """Тест того, что кэш процесса не видит сброса в другом"""
+        workers = [LocMemCache(f'worker{number}', {})
+                   for number in range(2)]
+        self.assertNotEqual(self.password_seen_after_change(*workers),
+                            self.user.password)
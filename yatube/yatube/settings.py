@@ -15,11 +15,27 @@ import os
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+JINJA2_TEMPLATES_DIR = os.path.join(BASE_DIR, 'jinja2')
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static/')]
-STATIC_URL = STATICFILES_DIRS[0]
+STATIC_URL = '/static/'
+# collectstatic собирает сюда файлы с отпечатками, манифест и сжатые
+# варианты, отдаёт их core.static.PrecompressedStaticFiles из wsgi.py.
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATICFILES_STORAGE = 'core.static.CompressedManifestStaticFilesStorage'
+# Кэш файлов без отпечатка в имени, с.
+STATIC_CACHE_MAX_AGE = 60
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь, mail_worker отправляет их через
+# OUTBOX_EMAIL_BACKEND.
+EMAIL_BACKEND = 'core.mail.OutboxBackend'
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
+# Пауза после первой неудачи, с; дальше удваивается.
+OUTBOX_RETRY_BACKOFF = 30
+# Файл, который держит запущенный mail_worker.
+OUTBOX_LOCK_FILE = os.path.join(BASE_DIR, 'mail_worker.lock')
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -52,10 +68,14 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
+    'core.querylog.QueryLogMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,14 +83,114 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReadReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# YATUBE_MEMCACHED=host:port[,host:port] подключает memcached, общий для
+# всех процессов. Без него кэш живёт в памяти процесса: версии лент,
+# лимиты и сброс пользователя видны только этому процессу.
+MEMCACHED_LOCATION = os.environ.get('YATUBE_MEMCACHED', '')
+if MEMCACHED_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': MEMCACHED_LOCATION.split(','),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
+
+# Пользователь сессии читается из кэша, сессия — из кэша с записью в
+# базу. Правка пользователя и выход сбрасывают запись сразу, срок
+# USER_CACHE_TIMEOUT лишь страхует от правок в обход модели. Сброс
+# должен дойти до всех процессов, поэтому в профиле production без
+# общего кэша пользователь и сессия читаются из базы.
+USER_CACHE_TIMEOUT = 60
+if MEMCACHED_LOCATION or os.environ.get('YATUBE_DB_PROFILE') != 'production':
+    AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+else:
+    AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+
+# Фоновые задачи core.tasks: аренда взятой задачи, размер пачки одного
+# процесса task_worker, число попыток и первая пауза перед повтором, с.
+TASK_LEASE = 5 * 60
+TASK_BATCH_SIZE = 10
+TASK_MAX_ATTEMPTS = 5
+TASK_RETRY_BACKOFF = 10
+
+# Сжатие gzip ответов core.compression: типы, наименьшая длина тела,
+# уровень и наибольшая случайная добавка к страницам с CSRF-токеном.
+COMPRESS_ENABLE = True
+COMPRESS_CONTENT_TYPES = ('text/html', 'application/json')
+COMPRESS_MIN_LENGTH = 500
+COMPRESS_LEVEL = 6
+COMPRESS_BREACH_PADDING = 100
+
+# Фрагменты лент сбрасываются по версии при записи, поэтому живут долго.
+# Карточка поста в ключе несёт отметку изменения, её можно хранить сутки.
+# Версии лент лежат в кэше и должны быть общими для всех процессов: в
+# профиле production без общего кэша сброс виден только одному процессу,
+# поэтому фрагменты живут 20 с, а страницы не получают ETag.
+FEED_VERSIONS_SHARED = (bool(MEMCACHED_LOCATION)
+                        or os.environ.get('YATUBE_DB_PROFILE') != 'production')
+if FEED_VERSIONS_SHARED:
+    FEED_CACHE_TIMEOUT = 60 * 60
+    POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+else:
+    FEED_CACHE_TIMEOUT = POST_CARD_CACHE_TIMEOUT = 20
+
+# Новый пост раскладывается по лентам подписчиков пачками по
+# TIMELINE_BATCH_SIZE, при подписке в ленту попадают последние
+# TIMELINE_BACKFILL_LIMIT постов автора.
+TIMELINE_BATCH_SIZE = 500
+TIMELINE_BACKFILL_LIMIT = 200
+
+# Лимиты частоты записи задаются у каждой view декоратором
+# core.ratelimit.ratelimit, счётчики лежат в кэше по умолчанию.
+RATELIMIT_ENABLE = True
+# Адреса и сети обратных прокси через запятую. Для запросов от них адрес
+# клиента берётся из X-Forwarded-For, иначе все клиенты за прокси делили
+# бы один лимит.
+TRUSTED_PROXIES = [
+    proxy.strip()
+    for proxy in os.environ.get('YATUBE_TRUSTED_PROXIES', '').split(',')
+    if proxy.strip()
+]
+
+# YATUBE_PROFILING=1 включает заголовок Server-Timing и строку в логе
+# yatube.profiling для каждого запроса, а для доли PROFILING_SAMPLE_RATE
+# запросов ещё и дамп cProfile в PROFILING_DUMP_DIR.
+PROFILING_ENABLE = os.environ.get('YATUBE_PROFILING') == '1'
+PROFILING_SAMPLE_RATE = float(
+    os.environ.get('YATUBE_PROFILING_SAMPLE_RATE', 0.01))
+PROFILING_DUMP_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# YATUBE_QUERYLOG=1 копит сводку запросов к постам, группам и комментариям
+# по формам и страницам (admin и manage.py top_queries), а запросы дольше
+# QUERYLOG_SLOW_MS пишет в лог вместе с планом.
+QUERYLOG_ENABLE = os.environ.get('YATUBE_QUERYLOG') == '1'
+QUERYLOG_TABLES = ('posts_post', 'posts_group', 'posts_comment')
+QUERYLOG_SLOW_MS = 100
+QUERYLOG_FLUSH_SECONDS = 10
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.profiling': {'handlers': ['console'], 'level': 'INFO'},
+        'yatube.querylog': {'handlers': ['console'], 'level': 'INFO'},
+    },
 }
 
 TEMPLATES = [
@@ -90,6 +210,25 @@ TEMPLATES = [
     },
 ]
 
+# Горячие страницы постов можно рисовать через Jinja2: движок ставится
+# первым и отдаёт шаблоны из JINJA2_TEMPLATES_DIR, остальные страницы
+# остаются на шаблонах Django. Включается YATUBE_TEMPLATE_ENGINE=jinja2.
+JINJA2_TEMPLATES = {
+    'BACKEND': 'django.template.backends.jinja2.Jinja2',
+    'DIRS': [JINJA2_TEMPLATES_DIR],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        'environment': 'core.jinja2.environment',
+        'context_processors': [
+            'django.template.context_processors.request',
+            'django.contrib.auth.context_processors.auth',
+            'core.context_processors.year.year',
+        ],
+    },
+}
+if os.environ.get('YATUBE_TEMPLATE_ENGINE') == 'jinja2':
+    TEMPLATES.insert(0, JINJA2_TEMPLATES)
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 # Database
@@ -102,6 +241,59 @@ DATABASES = {
     }
 }
 
+# Профиль для нескольких WSGI-процессов: YATUBE_DB_PROFILE=production
+# включает WAL, mmap и постоянные соединения, а запись идёт по одной
+# через файловую блокировку.
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 20000,
+    'temp_store': 'MEMORY',
+}
+SQLITE_PRAGMAS = {}
+SQLITE_WRITE_LOCK = None
+SQLITE_WRITE_RETRIES = 5
+SQLITE_WRITE_BACKOFF = 0.05
+if os.environ.get('YATUBE_DB_PROFILE') == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {'timeout': 20},
+    })
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+    SQLITE_WRITE_LOCK = DATABASES['default']['NAME'] + '.write-lock'
+
+# Реплики только для чтения: YATUBE_SQLITE_REPLICAS=2 добавляет файлы
+# replica1.sqlite3 и replica2.sqlite3, их заполняет manage.py sync_replicas.
+for number in range(1, int(os.environ.get('YATUBE_SQLITE_REPLICAS', 0)) + 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'replica{number}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# round_robin или least_lag; обе пропускают реплики старше MAX_LAG секунд.
+DATABASE_REPLICA_STRATEGY = 'round_robin'
+DATABASE_REPLICA_MAX_LAG = 30
+REPLICA_READ_VIEWS = [
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'api:posts',
+    'api:post_detail',
+    'api:post_comments',
+    'api:group_detail',
+    'api:group_posts',
+    'api:profile_detail',
+    'api:profile_posts',
+]
+# Закрепление после записи длится, пока выбранная реплика может её не
+# содержать.
+REPLICA_PIN_SECONDS = DATABASE_REPLICA_MAX_LAG
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
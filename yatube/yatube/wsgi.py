@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+from core.static import PrecompressedStaticFiles  # noqa: E402
+
+application = PrecompressedStaticFiles(application)